@@ -6,6 +6,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 from scipy import stats
 
+from discrete_samplers import AliasTable
+
 print("=== Distribution Simulation ===\n")
 
 # Set seed for reproducibility
@@ -53,6 +55,12 @@ print(f"4. Poisson(λ=4.5): mean={np.mean(poisson_samples):.3f}")
 uniform_samples = np.random.uniform(0, 1, n_samples)
 print(f"5. Uniform(0, 1): mean={np.mean(uniform_samples):.3f}")
 
+# 6. Arbitrary discrete distribution (loaded die) via an alias table
+die_probs = [0.1, 0.1, 0.1, 0.1, 0.1, 0.5]
+die_samples = AliasTable(die_probs, values=np.arange(1, 7)).sample(n_samples)
+print(f"6. Loaded die (alias table): mean={np.mean(die_samples):.3f} "
+      f"(true {np.dot(die_probs, np.arange(1, 7)):.1f})")
+
 # Visualization
 fig, axes = plt.subplots(2, 3, figsize=(15, 10))
 
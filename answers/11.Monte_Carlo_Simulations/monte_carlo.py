@@ -3,128 +3,682 @@ Monte Carlo Simulation
 Using simulation to estimate expectations and perform integration
 Based on the Law of Large Numbers
 """
+import time
+import warnings
+
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy import stats
+from scipy.stats import qmc
+
+
+def log_checkpoints(n, n_points=200):
+    """
+    Roughly log-spaced sample counts 1..n for convergence plots
+
+    Parameters:
+    -----------
+    n : int
+        Largest sample count
+    n_points : int
+        Number of checkpoints before duplicates are removed
+
+    Returns:
+    --------
+    checkpoints : array of int
+        Sorted unique counts, always including 1 and n
+    """
+    return np.unique(np.round(np.geomspace(1, n, n_points)).astype(np.int64))
+
+
+def running_estimate(samples, checkpoints=None, alpha=0.05, chunk_size=2**20):
+    """
+    Running mean, standard error and confidence band in one pass
+
+    Cumulative sums of the values and their squares give every prefix
+    mean and variance in O(n), instead of recomputing np.mean(samples[:i])
+    for each i. Values are shifted by the first draw before summing so the
+    variance does not suffer from cancellation.
+
+    Parameters:
+    -----------
+    samples : array or iterable of arrays
+        Draws, or chunks of draws from a generator so very long runs are
+        never held in memory
+    checkpoints : array of int, optional
+        Sample counts at which to report; defaults to every count, which
+        requires samples to be an array. Use log_checkpoints for long runs
+    alpha : float
+        Significance level of the normal confidence band
+    chunk_size : int
+        Chunk length used when samples is a single array
+
+    Returns:
+    --------
+    running : dict
+        n, mean, se, lower and upper, one entry per checkpoint
+    """
+    chunks = samples
+    if isinstance(samples, np.ndarray):
+        if checkpoints is None:
+            checkpoints = np.arange(1, len(samples) + 1)
+        chunks = (samples[i:i + chunk_size] for i in range(0, len(samples), chunk_size))
+    checkpoints = np.asarray(checkpoints, dtype=np.int64)
+
+    sums = np.zeros(len(checkpoints))
+    sums_sq = np.zeros(len(checkpoints))
+    shift = None
+    offset, total, total_sq = 0, 0.0, 0.0
+    for chunk in chunks:
+        chunk = np.asarray(chunk, dtype=float)
+        if len(chunk) == 0:
+            continue
+        if shift is None:
+            shift = chunk[0]
+        x = chunk - shift
+        cumulative = total + np.cumsum(x)
+        cumulative_sq = total_sq + np.cumsum(x**2)
+
+        # Checkpoints falling inside this chunk
+        lo, hi = np.searchsorted(checkpoints, [offset + 1, offset + len(chunk) + 1])
+        index = checkpoints[lo:hi] - offset - 1
+        sums[lo:hi] = cumulative[index]
+        sums_sq[lo:hi] = cumulative_sq[index]
+
+        offset += len(chunk)
+        total, total_sq = cumulative[-1], cumulative_sq[-1]
+
+    n = checkpoints[checkpoints <= offset]
+    sums, sums_sq = sums[:len(n)], sums_sq[:len(n)]
+    mean = sums / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = np.maximum(sums_sq - n * mean**2, 0) / (n - 1)
+    se = np.sqrt(variance / n)
+    z = stats.norm.ppf(1 - alpha / 2)
+    mean = mean + (shift if shift is not None else 0.0)
+    return {"n": n, "mean": mean, "se": se, "lower": mean - z * se, "upper": mean + z * se}
+
+
+def box_bounds(lower, upper):
+    """Lower and upper corners as float arrays, plus dimension and volume"""
+    lower = np.atleast_1d(np.asarray(lower, dtype=float))
+    upper = np.atleast_1d(np.asarray(upper, dtype=float))
+    return lower, upper, len(lower), np.prod(upper - lower)
+
+
+def to_box(u, lower, upper):
+    """Map points in [0,1]^d to the box; 1-D points stay a flat array"""
+    x = lower + u * (upper - lower)
+    return x[:, 0] if len(lower) == 1 else x
+
+
+def qmc_points(n_replicates, n_per_replicate, d, sequence="sobol", seed=None):
+    """
+    Independently scrambled low-discrepancy point sets, generated in bulk
+
+    Parameters:
+    -----------
+    n_replicates : int
+        Number of independent randomizations
+    n_per_replicate : int
+        Points per replicate; a power of 2 for Sobol
+    d : int
+        Dimension
+    sequence : str
+        'sobol' (Owen-scrambled) or 'halton' (scrambled)
+    seed : int, optional
+        Seed for the scrambles; None draws one from the global np.random state
+
+    Returns:
+    --------
+    u : array
+        (n_replicates, n_per_replicate, d) points in [0,1)^d
+    """
+    entropy = np.random.randint(2**31) if seed is None else seed
+    children = np.random.SeedSequence(entropy).spawn(n_replicates)
+    u = np.empty((n_replicates, n_per_replicate, d))
+    for r, child in enumerate(children):
+        rng = np.random.default_rng(child)
+        if sequence == "sobol":
+            u[r] = qmc.Sobol(d, scramble=True, seed=rng).random_base2(
+                int(np.log2(n_per_replicate)))
+        elif sequence == "halton":
+            u[r] = qmc.Halton(d, scramble=True, seed=rng).random(n_per_replicate)
+        else:
+            raise ValueError(f"Unknown sequence: {sequence}")
+    return u
+
+
+def mc_integrate(f, n, lower=0.0, upper=1.0, method="crude", control=None,
+                 control_mean=None, proposal=None, density=None, self_normalize=True,
+                 strata=10, sequence="sobol", n_replicates=16, transform=None,
+                 seed=None):
+    """
+    Monte Carlo integral of f over a box, with optional variance reduction
+
+    Every method also estimates, from the same evaluations, the variance
+    crude uniform sampling would have had with the same number of
+    evaluations of f, and reports the ratio.
+
+    Parameters:
+    -----------
+    f : callable
+        Vectorized integrand; takes (n,) points for 1-D boxes, else (n, d)
+    n : int
+        Number of evaluations of f
+    lower, upper : float or array
+        Corners of the integration box
+    method : str
+        'crude', 'antithetic' (pairs u and 1 - u), 'control' (control
+        variates with the optimal coefficient estimated in the same pass),
+        'importance' (self-normalized weights), 'stratified' (equal
+        cells per axis, proportional allocation) or 'qmc' (randomized
+        quasi-Monte Carlo)
+    control : callable, optional
+        For 'control': h(x) returning (n,) or (n, k) values with known mean
+    control_mean : float or array, optional
+        For 'control': mean of h under the uniform distribution on the box
+    proposal : frozen scipy distribution, optional
+        For 'importance': sampling distribution with rvs() and logpdf();
+        use a multivariate (or product) distribution when d > 1
+    density : callable, optional
+        For 'importance': target density p, possibly unnormalized, on the
+        box (which may be infinite). The estimate is then E_p[f] rather
+        than the box integral, and crude means sampling from p directly
+    self_normalize : bool
+        For 'importance': divide by the sum of the weights instead of n.
+        Required when density is unnormalized; with the uniform target it
+        is stable only if the proposal covers the whole box well
+    strata : int
+        For 'stratified': cells per axis, strata**d cells in total, each
+        with at least 2 draws; reduced when that would exceed n
+    sequence : str
+        For 'qmc': 'sobol' or 'halton'
+    n_replicates : int
+        For 'qmc': independent scrambles; the spread of their means gives
+        the standard error. Sobol uses the largest power of 2 per replicate
+        that fits in n. This standard error is not valid for 1-D Sobol:
+        scipy's scrambles then give replicates with the same mean up to
+        rounding, while the points sit on a 2^-30 grid whose bias remains.
+        A warning is issued when the spread collapses like this
+    transform : callable, optional
+        Change of variables applied to the box points before f, e.g.
+        stats.norm.ppf on the unit cube to integrate against a normal.
+        The estimate is then volume * E[f(transform(X))]; not used by
+        'importance'
+    seed : int, optional
+        Seed for a dedicated Generator; None uses the global np.random state
+
+    Returns:
+    --------
+    result : dict
+        estimate, se, n (evaluations used), crude_se and variance_ratio
+        (crude variance over method variance at equal evaluations)
+    """
+    rng = np.random if seed is None else np.random.default_rng(seed)
+    lower, upper, d, volume = box_bounds(lower, upper)
+
+    def points(u):
+        x = to_box(u, lower, upper)
+        return x if transform is None else transform(x)
+
+    if method == "crude":
+        values = volume * f(points(rng.uniform(size=(n, d))))
+        estimate = np.mean(values)
+        se = np.std(values, ddof=1) / np.sqrt(n)
+        crude_var = np.var(values, ddof=1)
+
+    elif method == "antithetic":
+        u = rng.uniform(size=(n // 2, d))
+        values = volume * f(points(np.concatenate([u, 1 - u])))
+        pairs = (values[:n // 2] + values[n // 2:]) / 2
+        n = 2 * (n // 2)
+        estimate = np.mean(pairs)
+        se = np.std(pairs, ddof=1) / np.sqrt(n // 2)
+        crude_var = np.var(values, ddof=1)
+
+    elif method == "control":
+        x = points(rng.uniform(size=(n, d)))
+        values = volume * f(x)
+        h = np.asarray(control(x), dtype=float).reshape(n, -1)
+        centered = h - np.asarray(control_mean, dtype=float)
+
+        # Optimal coefficients: regress f on the centred controls
+        design = np.column_stack([np.ones(n), centered])
+        coef, *_ = np.linalg.lstsq(design, values, rcond=None)
+        residuals = values - design @ coef
+        estimate = coef[0]
+        se = np.sqrt(np.sum(residuals**2) / (n - design.shape[1]) / n)
+        crude_var = np.var(values, ddof=1)
+
+    elif method == "importance":
+        random_state = None if rng is np.random else rng
+        x = proposal.rvs(size=n, random_state=random_state).reshape(n, d)
+        inside = np.all((x >= lower) & (x <= upper), axis=1)
+        inside_points = x[inside, 0] if d == 1 else x[inside]
+        log_q = np.asarray(proposal.logpdf(x[:, 0] if d == 1 else x)).reshape(n)
+
+        # Weights p/q; the uniform target contributes the box volume as scale
+        scale = 1.0 if density is not None else volume
+        weights = np.zeros(n)
+        target = density(inside_points) if density is not None else 1 / volume
+        weights[inside] = target * np.exp(-log_q[inside])
+        values = np.zeros(n)
+        values[inside] = scale * f(inside_points)
+
+        if self_normalize:
+            normalized = weights / np.sum(weights)
+            estimate = np.sum(normalized * values)
+            # Delta-method variance of the ratio estimator
+            se = np.sqrt(np.sum(normalized**2 * (values - estimate)**2))
+        else:
+            weighted = weights * values
+            estimate = np.mean(weighted)
+            se = np.std(weighted, ddof=1) / np.sqrt(n)
+            normalized = weights / n
+        # E_p[value^2] - E_p[value]^2 from the same weighted draws
+        crude_var = np.sum(normalized * values**2) - estimate**2
+
+    elif method == "stratified":
+        # Coarsen the grid when two draws per cell would exceed the budget
+        if 2 * strata**d > n:
+            strata = max(1, int((n // 2)**(1 / d)))
+            while 2 * (strata + 1)**d <= n:
+                strata += 1
+        n_cells = strata**d
+        per_cell = max(2, n // n_cells)
+        n = per_cell * n_cells
+        # Cell corners on a regular grid, one row per draw
+        corners = np.stack(np.meshgrid(*[np.arange(strata)] * d, indexing='ij'),
+                           axis=-1).reshape(n_cells, d)
+        u = (np.repeat(corners, per_cell, axis=0) + rng.uniform(size=(n, d))) / strata
+        values = volume * f(points(u)).reshape(n_cells, per_cell)
+        estimate = np.mean(values)
+        se = np.sqrt(np.sum(np.var(values, axis=1, ddof=1) / per_cell)) / n_cells
+        crude_var = np.var(values, ddof=1)
+
+    elif method == "qmc":
+        if n_replicates < 2:
+            raise ValueError("qmc needs n_replicates >= 2 for an error estimate")
+        min_n = 2 * n_replicates if sequence == "sobol" else n_replicates
+        if n < min_n:
+            raise ValueError(f"qmc with {sequence} needs n >= {min_n} "
+                             f"for {n_replicates} replicates, got n={n}")
+        per_replicate = n // n_replicates
+        if sequence == "sobol":
+            per_replicate = 2**int(np.log2(per_replicate))
+        n = per_replicate * n_replicates
+        u = qmc_points(n_replicates, per_replicate, d, sequence, seed)
+        values = volume * f(points(u.reshape(n, d)))
+        replicate_means = values.reshape(n_replicates, per_replicate).mean(axis=1)
+        estimate = np.mean(replicate_means)
+        se = np.std(replicate_means, ddof=1) / np.sqrt(n_replicates)
+        # Each scrambled point is marginally uniform, so the pooled values
+        # still estimate the crude variance
+        crude_var = np.var(values, ddof=1)
+        if se < 2**-30 * np.sqrt(crude_var):
+            warnings.warn("qmc replicate means agree below the 2^-30 resolution "
+                          "of the points, so the standard error understates the "
+                          "error (as with 1-D Sobol)", RuntimeWarning)
+
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    crude_se = np.sqrt(crude_var / n)
+    return {"estimate": estimate, "se": se, "n": n, "crude_se": crude_se,
+            "variance_ratio": crude_se**2 / se**2 if se > 0 else np.inf}
+
+
+def adaptive_integrate(f, lower=0.0, upper=1.0, atol=None, rtol=None, alpha=0.05,
+                       chunk_size=2**16, max_samples=10**9, transform=None, seed=None):
+    """
+    Monte Carlo integral that samples until a target accuracy is reached
 
-print("=== Monte Carlo Simulation ===\n")
+    Draws are taken in fixed-size chunks and merged into running moments
+    (Welford, batch form), so memory stays at one chunk. Sampling stops,
+    after at least two chunks, once the confidence interval half-width is
+    at most max(atol, rtol * |estimate|).
 
-# Key Concept 1: Estimating Expectations using LLN
-print("--- Example 1: Estimating E[X] for Normal Distribution ---")
-print("True E[X] = μ = 5\n")
+    Parameters:
+    -----------
+    f : callable
+        Vectorized integrand; takes (n,) points for 1-D boxes, else (n, d)
+    lower, upper : float or array
+        Corners of the integration box
+    atol, rtol : float, optional
+        Absolute and relative tolerance on the half-width; at least one
+    alpha : float
+        Significance level of the interval
+    chunk_size : int
+        Draws per chunk
+    max_samples : int
+        Upper bound on evaluations of f
+    transform : callable, optional
+        Change of variables applied to the box points, as in mc_integrate
+    seed : int, optional
+        Seed for a dedicated Generator; None uses the global np.random state
 
-np.random.seed(42)
-mu, sigma = 5, 2
-sample_sizes = [10, 100, 1000, 10000]
+    Returns:
+    --------
+    result : dict
+        estimate, se, half_width, n (samples used), converged and
+        wall_time in seconds
+    """
+    if atol is None and rtol is None:
+        raise ValueError("Give atol, rtol or both")
+    if max_samples < 2:
+        raise ValueError("max_samples must be at least 2")
+    rng = np.random if seed is None else np.random.default_rng(seed)
+    lower, upper, d, volume = box_bounds(lower, upper)
+    z = stats.norm.ppf(1 - alpha / 2)
 
-print(f"{'Sample Size':<15} {'Estimated E[X]':<20} {'Error':<15}")
-print("-" * 50)
+    start = time.perf_counter()
+    n, mean, m2 = 0, 0.0, 0.0
+    n_chunks = 0
+    converged = False
+    while n < max_samples:
+        k = min(chunk_size, max_samples - n)
+        x = to_box(rng.uniform(size=(k, d)), lower, upper)
+        values = volume * f(x if transform is None else transform(x))
 
-for n in sample_sizes:
-    samples = np.random.normal(mu, sigma, n)
-    estimate = np.mean(samples)
-    error = abs(estimate - mu)
-    print(f"{n:<15} {estimate:<20.6f} {error:<15.6e}")
+        # Merge the chunk's moments into the running ones
+        chunk_mean = np.mean(values)
+        delta = chunk_mean - mean
+        total = n + k
+        mean += delta * k / total
+        m2 += np.sum((values - chunk_mean)**2) + delta**2 * n * k / total
+        n = total
+        n_chunks += 1
+
+        se = np.sqrt(m2 / (n - 1) / n) if n > 1 else np.inf
+        tolerance = max(atol or 0.0, (rtol or 0.0) * abs(mean))
+        # A single chunk can show no spread by chance, so never stop on one
+        if n_chunks >= 2 and z * se <= tolerance:
+            converged = True
+            break
+
+    return {"estimate": mean, "se": se, "half_width": z * se, "n": n,
+            "converged": converged, "wall_time": time.perf_counter() - start}
+
+
+def sampling_distribution(dist, statistic, sample_size, n_experiments=1000,
+                          quantiles=(0.025, 0.25, 0.5, 0.75, 0.975),
+                          max_block_bytes=2**27, seed=None):
+    """
+    Simulate the sampling distribution of a statistic
+
+    Experiments are generated as rows of an (n_experiments, n) matrix,
+    in blocks of rows capped by max_block_bytes, and the statistic is
+    applied along axis=1. Several sample sizes are handled in one pass:
+    each block is drawn at the largest size and the smaller sizes use its
+    leading columns, so experiment i at size n is a prefix of experiment
+    i at any larger size.
+
+    Parameters:
+    -----------
+    dist : frozen scipy distribution
+        Population to sample from, e.g. stats.norm(5, 2)
+    statistic : callable
+        Statistic accepting an axis argument, e.g. np.mean or np.median
+    sample_size : int or sequence of int
+        Sample size, or sizes to sweep over
+    n_experiments : int
+        Number of simulated samples per size
+    quantiles : sequence of float
+        Probabilities at which to report quantiles
+    max_block_bytes : int
+        Memory cap for one block of draws
+    seed : int, optional
+        Seed for a dedicated Generator; None uses the global np.random state
+
+    Returns:
+    --------
+    result : dict
+        distribution, mean, sd, skewness, excess kurtosis and quantiles
+        (probability -> value); for a sequence of sizes, a dict mapping
+        each size to such a result
+    """
+    sizes = np.atleast_1d(sample_size).astype(int)
+    max_n = sizes.max()
+    random_state = None if seed is None else np.random.default_rng(seed)
+    block = max(1, max_block_bytes // (8 * max_n))
+
+    values = np.empty((len(sizes), n_experiments))
+    for start in range(0, n_experiments, block):
+        rows = min(block, n_experiments - start)
+        draws = dist.rvs(size=(rows, max_n), random_state=random_state)
+        for i, n in enumerate(sizes):
+            values[i, start:start + rows] = statistic(draws[:, :n], axis=1)
+
+    results = {}
+    for n, distribution in zip(sizes, values):
+        results[int(n)] = {
+            "distribution": distribution,
+            "mean": np.mean(distribution),
+            "sd": np.std(distribution, ddof=1),
+            "skewness": stats.skew(distribution),
+            "kurtosis": stats.kurtosis(distribution),
+            "quantiles": dict(zip(quantiles, np.quantile(distribution, quantiles))),
+        }
+    return results[int(sizes[0])] if np.ndim(sample_size) == 0 else results
 
-# Example 2: Monte Carlo Integration
-print("\n--- Example 2: Monte Carlo Integration ---")
-print("Estimate ∫₀¹ x² dx = 1/3 ≈ 0.333333\n")
 
 def f(x):
     return x**2
 
-n_samples = 100000
-x_samples = np.random.uniform(0, 1, n_samples)
-f_samples = f(x_samples)
-mc_estimate = np.mean(f_samples) * (1 - 0)  # * (b - a)
-
-print(f"True value: {1/3:.6f}")
-print(f"Monte Carlo estimate (n={n_samples}): {mc_estimate:.6f}")
-print(f"Error: {abs(mc_estimate - 1/3):.6e}\n")
-
-# Example 3: Estimating π using Monte Carlo
-print("--- Example 3: Estimating π ---")
-print("Sample points uniformly in [0,1]×[0,1] square")
-print("Count how many fall inside quarter circle\n")
-
-n_points = 100000
-x = np.random.uniform(0, 1, n_points)
-y = np.random.uniform(0, 1, n_points)
-
-inside_circle = (x**2 + y**2) <= 1
-pi_estimate = 4 * np.sum(inside_circle) / n_points
-
-print(f"True π: {np.pi:.6f}")
-print(f"Monte Carlo estimate (n={n_points}): {pi_estimate:.6f}")
-print(f"Error: {abs(pi_estimate - np.pi):.6e}\n")
-
-# Example 4: Convergence visualization
-print("--- Example 4: Convergence of Monte Carlo Estimates ---")
-
-np.random.seed(42)
-max_n = 10000
-cumulative_means = []
-
-samples = np.random.normal(mu, sigma, max_n)
-for i in range(1, max_n + 1):
-    cumulative_means.append(np.mean(samples[:i]))
-
-# Visualization
-fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-
-# Plot 1: Convergence of mean estimate
-axes[0, 0].plot(range(1, max_n + 1), cumulative_means, 'b-', alpha=0.7)
-axes[0, 0].axhline(y=mu, color='r', linestyle='--', linewidth=2, label=f'True mean = {mu}')
-axes[0, 0].set_xlabel('Sample Size')
-axes[0, 0].set_ylabel('Estimated Mean')
-axes[0, 0].set_title('Convergence of Monte Carlo Estimate')
-axes[0, 0].legend()
-axes[0, 0].grid(True, alpha=0.3)
-axes[0, 0].set_xscale('log')
-
-# Plot 2: Integration example
-x_plot = np.linspace(0, 1, 1000)
-axes[0, 1].plot(x_plot, f(x_plot), 'b-', linewidth=2, label='f(x) = x²')
-axes[0, 1].fill_between(x_plot, f(x_plot), alpha=0.3)
-axes[0, 1].set_xlabel('x')
-axes[0, 1].set_ylabel('f(x)')
-axes[0, 1].set_title(f'Monte Carlo Integration: ∫₀¹ x² dx')
-axes[0, 1].legend()
-axes[0, 1].grid(True, alpha=0.3)
-axes[0, 1].text(0.5, 0.5, f'MC estimate: {mc_estimate:.4f}\nTrue value: {1/3:.4f}',
-                bbox=dict(boxstyle='round', facecolor='wheat'))
-
-# Plot 3: π estimation visualization
-axes[1, 0].scatter(x[inside_circle][:1000], y[inside_circle][:1000],
-                  c='blue', s=1, alpha=0.5, label='Inside')
-axes[1, 0].scatter(x[~inside_circle][:1000], y[~inside_circle][:1000],
-                  c='red', s=1, alpha=0.5, label='Outside')
-theta = np.linspace(0, np.pi/2, 100)
-axes[1, 0].plot(np.cos(theta), np.sin(theta), 'k-', linewidth=2)
-axes[1, 0].set_xlabel('x')
-axes[1, 0].set_ylabel('y')
-axes[1, 0].set_title(f'Estimating π: {pi_estimate:.4f}')
-axes[1, 0].legend()
-axes[1, 0].set_aspect('equal')
-
-# Plot 4: Distribution of sample means (CLT)
-n_experiments = 1000
-sample_size = 30
-sample_means = [np.mean(np.random.normal(mu, sigma, sample_size))
-                for _ in range(n_experiments)]
-
-axes[1, 1].hist(sample_means, bins=30, density=True, alpha=0.7, edgecolor='black')
-# Theoretical distribution: N(μ, σ²/n)
-x_range = np.linspace(min(sample_means), max(sample_means), 100)
-theoretical_density = stats.norm.pdf(x_range, mu, sigma/np.sqrt(sample_size))
-axes[1, 1].plot(x_range, theoretical_density, 'r-', linewidth=2, label='Theoretical')
-axes[1, 1].set_xlabel('Sample Mean')
-axes[1, 1].set_ylabel('Density')
-axes[1, 1].set_title('Distribution of Sample Means (CLT)')
-axes[1, 1].legend()
-axes[1, 1].grid(True, alpha=0.3)
-
-plt.tight_layout()
-plt.savefig('/home/titan/pdfs/notes/statisticalComputingAndReporting/groupWork/answers/11.Monte_Carlo_Simulations/monte_carlo.png', dpi=150)
-print("Visualization saved as monte_carlo.png")
-plt.close()
+
+if __name__ == "__main__":
+    print("=== Monte Carlo Simulation ===\n")
+
+    # Key Concept 1: Estimating Expectations using LLN
+    print("--- Example 1: Estimating E[X] for Normal Distribution ---")
+    print("True E[X] = μ = 5\n")
+
+    np.random.seed(42)
+    mu, sigma = 5, 2
+    sample_sizes = [10, 100, 1000, 10000]
+
+    print(f"{'Sample Size':<15} {'Estimated E[X]':<20} {'Error':<15}")
+    print("-" * 50)
+
+    for n in sample_sizes:
+        samples = np.random.normal(mu, sigma, n)
+        estimate = np.mean(samples)
+        error = abs(estimate - mu)
+        print(f"{n:<15} {estimate:<20.6f} {error:<15.6e}")
+
+    # Example 2: Monte Carlo Integration
+    print("\n--- Example 2: Monte Carlo Integration ---")
+    print("Estimate ∫₀¹ x² dx = 1/3 ≈ 0.333333\n")
+
+    n_samples = 100000
+    x_samples = np.random.uniform(0, 1, n_samples)
+    f_samples = f(x_samples)
+    mc_estimate = np.mean(f_samples) * (1 - 0)  # * (b - a)
+
+    print(f"True value: {1/3:.6f}")
+    print(f"Monte Carlo estimate (n={n_samples}): {mc_estimate:.6f}")
+    print(f"Error: {abs(mc_estimate - 1/3):.6e}\n")
+
+    # Example 3: Estimating π using Monte Carlo
+    print("--- Example 3: Estimating π ---")
+    print("Sample points uniformly in [0,1]×[0,1] square")
+    print("Count how many fall inside quarter circle\n")
+
+    n_points = 100000
+    x = np.random.uniform(0, 1, n_points)
+    y = np.random.uniform(0, 1, n_points)
+
+    inside_circle = (x**2 + y**2) <= 1
+    pi_estimate = 4 * np.sum(inside_circle) / n_points
+
+    print(f"True π: {np.pi:.6f}")
+    print(f"Monte Carlo estimate (n={n_points}): {pi_estimate:.6f}")
+    print(f"Error: {abs(pi_estimate - np.pi):.6e}\n")
+
+    # Example 4: Convergence visualization
+    print("--- Example 4: Convergence of Monte Carlo Estimates ---")
+
+    np.random.seed(42)
+    max_n = 10000
+
+    samples = np.random.normal(mu, sigma, max_n)
+    running = running_estimate(samples, log_checkpoints(max_n))
+
+    # Long runs stream in chunks; only the checkpoints are kept
+    n_long, chunk = 10**7, 2**20
+    stream = (np.random.normal(mu, sigma, min(chunk, n_long - i)) for i in range(0, n_long, chunk))
+    long_run = running_estimate(stream, log_checkpoints(n_long))
+    print(f"Running estimate after {long_run['n'][-1]:.0e} draws: {long_run['mean'][-1]:.6f} "
+          f"± {long_run['se'][-1]:.1e} ({len(long_run['n'])} checkpoints stored)\n")
+
+    # Example 5: Variance reduction at a fixed budget of evaluations
+    print("--- Example 5: Variance Reduction ---")
+    print(f"{'Integral':<10} {'Method':<12} {'Estimate':<12} {'SE':<12} {'Variance ratio':<15}")
+    print("-" * 61)
+
+    quarter_circle = lambda p: 4.0 * (p[:, 0]**2 + p[:, 1]**2 <= 1)
+    problems = [
+        ("x^2", f, 0.0, 1.0, [
+            ("crude", {}),
+            ("antithetic", {}),
+            ("control", {"control": lambda x: x, "control_mean": 0.5}),
+            ("importance", {"proposal": stats.beta(2, 1), "self_normalize": False}),
+            ("stratified", {"strata": 1000}),
+            ("qmc", {"sequence": "halton"}),
+        ]),
+        ("pi", quarter_circle, [0, 0], [1, 1], [
+            ("crude", {}),
+            ("antithetic", {}),
+            ("control", {"control": lambda p: p[:, 0]**2 + p[:, 1]**2,
+                         "control_mean": 2 / 3}),
+            ("stratified", {"strata": 100}),
+            ("qmc", {"sequence": "sobol"}),
+        ]),
+        # Expectation under an unnormalized density: self-normalized weights
+        ("E[Z^4]", lambda x: x**4, -np.inf, np.inf, [
+            ("importance", {"proposal": stats.norm(0, 2),
+                            "density": lambda x: np.exp(-x**2 / 2)}),
+        ]),
+    ]
+    for name, integrand, lo, hi, methods in problems:
+        for method, options in methods:
+            result = mc_integrate(integrand, 100000, lo, hi, method=method, seed=42,
+                                  **options)
+            label = options.get("sequence", method)
+            print(f"{name:<10} {label:<12} {result['estimate']:<12.6f} "
+                  f"{result['se']:<12.2e} {result['variance_ratio']:<15.4g}")
+    print()
+
+    # Example 6: Quasi-Monte Carlo on a smooth 5-d integrand
+    print("--- Example 6: Randomized Quasi-Monte Carlo ---")
+    print("∫ over [0,1]^5 of prod (π/2) sin(π x_i) dx = 1, and E[exp(mean of 5 N(0,1))]\n")
+
+    def sine_product(x):
+        return np.prod(np.pi / 2 * np.sin(np.pi * x), axis=1)
+
+    print(f"{'n':<10} {'Crude SE':<12} {'Sobol SE':<12} {'Halton SE':<12}")
+    print("-" * 46)
+    for n in [2**10, 2**13, 2**16, 2**19]:
+        crude = mc_integrate(sine_product, n, np.zeros(5), np.ones(5), seed=1)
+        sobol = mc_integrate(sine_product, n, np.zeros(5), np.ones(5), method="qmc", seed=1)
+        halton = mc_integrate(sine_product, n, np.zeros(5), np.ones(5), method="qmc",
+                              sequence="halton", seed=1)
+        print(f"{n:<10} {crude['se']:<12.2e} {sobol['se']:<12.2e} {halton['se']:<12.2e}")
+
+    # Transformed domain: unit cube -> R^5 through the normal quantile function
+    gaussian = mc_integrate(lambda z: np.exp(z.mean(axis=1)), 2**16, np.zeros(5), np.ones(5),
+                            method="qmc", transform=stats.norm.ppf, seed=1)
+    print(f"\nGaussian expectation: {gaussian['estimate']:.6f} ± {gaussian['se']:.1e} "
+          f"(true {np.exp(0.1):.6f}, variance ratio {gaussian['variance_ratio']:.0f})\n")
+
+    # Example 7: Sample until the interval is narrow enough
+    print("--- Example 7: Tolerance-Targeted Integration ---")
+    print(f"{'Integral':<10} {'Tolerance':<16} {'Estimate':<12} {'Half-width':<12} "
+          f"{'Samples':<12} {'Time (s)':<10}")
+    print("-" * 72)
+    targets = [("x^2", f, 0.0, 1.0, {"atol": 1e-3}),
+               ("x^2", f, 0.0, 1.0, {"atol": 1e-4}),
+               ("pi", quarter_circle, [0, 0], [1, 1], {"rtol": 1e-3}),
+               ("pi", quarter_circle, [0, 0], [1, 1], {"rtol": 3e-4})]
+    for name, integrand, lo, hi, tolerance in targets:
+        result = adaptive_integrate(integrand, lo, hi, seed=42, **tolerance)
+        label = ", ".join(f"{key}={value:g}" for key, value in tolerance.items())
+        print(f"{name:<10} {label:<16} {result['estimate']:<12.6f} "
+              f"{result['half_width']:<12.2e} {result['n']:<12} {result['wall_time']:<10.3f}")
+    print()
+
+    # Example 8: Sampling distributions across many sample sizes in one pass
+    print("--- Example 8: Sampling Distribution of the Mean, Exponential(1) ---")
+    print(f"{'n':<8} {'SD':<10} {'1/sqrt(n)':<10} {'Skewness':<10} {'2/sqrt(n)':<10} "
+          f"{'2.5%':<10} {'97.5%':<10}")
+    print("-" * 68)
+    sweep = sampling_distribution(stats.expon(), np.mean, [5, 10, 30, 100, 300, 1000],
+                                  n_experiments=20000, seed=42)
+    for n, result in sweep.items():
+        print(f"{n:<8} {result['sd']:<10.4f} {1 / np.sqrt(n):<10.4f} "
+              f"{result['skewness']:<10.3f} {2 / np.sqrt(n):<10.3f} "
+              f"{result['quantiles'][0.025]:<10.4f} {result['quantiles'][0.975]:<10.4f}")
+    print()
+
+    # Visualization
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+    # Plot 1: Convergence of mean estimate
+    axes[0, 0].plot(running['n'], running['mean'], 'b-', alpha=0.7)
+    axes[0, 0].fill_between(running['n'], running['lower'], running['upper'], alpha=0.2,
+                            label='95% CI')
+    axes[0, 0].axhline(y=mu, color='r', linestyle='--', linewidth=2, label=f'True mean = {mu}')
+    axes[0, 0].set_xlabel('Sample Size')
+    axes[0, 0].set_ylabel('Estimated Mean')
+    axes[0, 0].set_title('Convergence of Monte Carlo Estimate')
+    axes[0, 0].legend()
+    axes[0, 0].grid(True, alpha=0.3)
+    axes[0, 0].set_xscale('log')
+
+    # Plot 2: Integration example
+    x_plot = np.linspace(0, 1, 1000)
+    axes[0, 1].plot(x_plot, f(x_plot), 'b-', linewidth=2, label='f(x) = x²')
+    axes[0, 1].fill_between(x_plot, f(x_plot), alpha=0.3)
+    axes[0, 1].set_xlabel('x')
+    axes[0, 1].set_ylabel('f(x)')
+    axes[0, 1].set_title(f'Monte Carlo Integration: ∫₀¹ x² dx')
+    axes[0, 1].legend()
+    axes[0, 1].grid(True, alpha=0.3)
+    axes[0, 1].text(0.5, 0.5, f'MC estimate: {mc_estimate:.4f}\nTrue value: {1/3:.4f}',
+                    bbox=dict(boxstyle='round', facecolor='wheat'))
+
+    # Plot 3: π estimation visualization
+    axes[1, 0].scatter(x[inside_circle][:1000], y[inside_circle][:1000],
+                      c='blue', s=1, alpha=0.5, label='Inside')
+    axes[1, 0].scatter(x[~inside_circle][:1000], y[~inside_circle][:1000],
+                      c='red', s=1, alpha=0.5, label='Outside')
+    theta = np.linspace(0, np.pi/2, 100)
+    axes[1, 0].plot(np.cos(theta), np.sin(theta), 'k-', linewidth=2)
+    axes[1, 0].set_xlabel('x')
+    axes[1, 0].set_ylabel('y')
+    axes[1, 0].set_title(f'Estimating π: {pi_estimate:.4f}')
+    axes[1, 0].legend()
+    axes[1, 0].set_aspect('equal')
+
+    # Plot 4: Distribution of sample means (CLT)
+    n_experiments = 1000
+    sample_size = 30
+    sample_means = sampling_distribution(stats.norm(mu, sigma), np.mean, sample_size,
+                                         n_experiments)["distribution"]
+
+    axes[1, 1].hist(sample_means, bins=30, density=True, alpha=0.7, edgecolor='black')
+    # Theoretical distribution: N(μ, σ²/n)
+    x_range = np.linspace(min(sample_means), max(sample_means), 100)
+    theoretical_density = stats.norm.pdf(x_range, mu, sigma/np.sqrt(sample_size))
+    axes[1, 1].plot(x_range, theoretical_density, 'r-', linewidth=2, label='Theoretical')
+    axes[1, 1].set_xlabel('Sample Mean')
+    axes[1, 1].set_ylabel('Density')
+    axes[1, 1].set_title('Distribution of Sample Means (CLT)')
+    axes[1, 1].legend()
+    axes[1, 1].grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig('/home/titan/pdfs/notes/statisticalComputingAndReporting/groupWork/answers/11.Monte_Carlo_Simulations/monte_carlo.png', dpi=150)
+    print("Visualization saved as monte_carlo.png")
+    plt.close()
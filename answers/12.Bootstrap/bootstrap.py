@@ -2,30 +2,172 @@
 Bootstrap Resampling
 Nonparametric and parametric bootstrap for inference
 """
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy import stats
 
-print("=== Bootstrap Resampling ===\n")
+def supports_axis(statistic, data):
+    """
+    Check whether a statistic can be applied to a 2-D batch of resamples
+
+    Parameters:
+    -----------
+    statistic : callable
+        Function to compute on each bootstrap sample
+    data : array
+        Original sample
+
+    Returns:
+    --------
+    bool
+        True if statistic(batch, axis=1) gives one value per row that
+        matches calling statistic row by row
+    """
+    probe = np.vstack([data, data[::-1]])
+    try:
+        batched = np.asarray(statistic(probe, axis=1), dtype=float)
+        looped = np.array([statistic(row) for row in probe], dtype=float)
+    except (TypeError, ValueError):
+        return False
+    return batched.shape == (2,) and np.allclose(batched, looped, equal_nan=True)
+
+
+def apply_in_chunks(draw, statistic, n_replicates, n, batch, max_batch_bytes,
+                    bytes_per_element=16):
+    """
+    Compute a statistic over n_replicates resamples of size n
+
+    Parameters:
+    -----------
+    draw : callable
+        draw(rows) returns a (rows, n) array of resamples
+    statistic : callable
+        Function to compute on each bootstrap sample
+    n_replicates : int
+        Number of bootstrap samples
+    n : int
+        Size of each bootstrap sample
+    batch : bool
+        If True, call statistic(chunk, axis=1) on whole chunks,
+        otherwise draw and evaluate one resample at a time
+    max_batch_bytes : int
+        Memory budget for one chunk of indices plus resampled values
+    bytes_per_element : int
+        Peak bytes draw needs per resampled element; the default is one
+        int64 index plus one float64 value
+
+    Returns:
+    --------
+    bootstrap_statistics : array
+        Bootstrap distribution of statistic
+    """
+    if not batch:
+        bootstrap_stats = []
+
+        for _ in range(n_replicates):
+            bootstrap_sample = draw(1)[0]
+            stat = statistic(bootstrap_sample)
+            bootstrap_stats.append(stat)
+
+        return np.array(bootstrap_stats)
 
-# Generate sample data
-np.random.seed(42)
-n = 50
-true_mean = 10
-true_std = 3
-data = np.random.normal(true_mean, true_std, n)
+    rows_per_chunk = max(1, min(n_replicates, max_batch_bytes // (bytes_per_element * n)))
+    bootstrap_stats = np.empty(n_replicates)
+
+    for start in range(0, n_replicates, rows_per_chunk):
+        stop = min(start + rows_per_chunk, n_replicates)
+        bootstrap_stats[start:stop] = statistic(draw(stop - start), axis=1)
+
+    return bootstrap_stats
+
+
+def resample_shard(data, statistic, batch, max_batch_bytes, n_replicates,
+                   seed_seq=None):
+    """
+    Nonparametric bootstrap for one shard of replicates
+
+    Uses the global NumPy RNG when seed_seq is None, otherwise a private
+    Generator seeded from seed_seq. Defined at module level so it can be
+    sent to worker processes.
+    """
+    n = len(data)
+    randint = np.random.randint if seed_seq is None else \
+        np.random.default_rng(seed_seq).integers
+
+    def draw(rows):
+        # Resample with replacement: one row of indices per replicate.
+        # Draws the same stream as np.random.choice(data, size=n)
+        return data[randint(0, n, size=(rows, n))]
+
+    return apply_in_chunks(draw, statistic, n_replicates, n, batch,
+                           max_batch_bytes)
+
+
+def parametric_shard(dist, n, statistic, batch, max_batch_bytes, n_replicates,
+                     seed_seq=None):
+    """
+    Parametric bootstrap for one shard of replicates
+
+    Uses the global NumPy RNG when seed_seq is None, otherwise a private
+    Generator seeded from seed_seq.
+    """
+    rng = None if seed_seq is None else np.random.default_rng(seed_seq)
+
+    def draw(rows):
+        return dist.rvs(size=(rows, n), random_state=rng)
+
+    return apply_in_chunks(draw, statistic, n_replicates, n, batch,
+                           max_batch_bytes)
+
+
+def run_shards(shard, n_replicates, seed, n_workers, shard_size):
+    """
+    Split replicates into fixed-size shards and run them, optionally in parallel
+
+    Shared by the bootstrap and permutation test scripts.
+
+    Parameters:
+    -----------
+    shard : callable
+        shard(n_replicates, seed_seq) returns the statistics for one shard;
+        must be picklable when n_workers is not 1
+    n_replicates : int
+        Total number of replicates (bootstrap samples or permutations)
+    seed : int or None
+        Root seed; shard i uses SeedSequence(seed).spawn(...)[i]
+    n_workers : int or None
+        Number of worker processes. 1 runs the shards in this process,
+        None uses all CPUs
+    shard_size : int
+        Replicates per shard
+
+    Returns:
+    --------
+    statistics : array
+        Shard results concatenated in shard order
+
+    Shards depend only on seed and shard_size, never on n_workers, so the
+    result is bit-identical for any number of workers.
+    """
+    n_shards = -(-n_replicates // shard_size)
+    sizes = [min(shard_size, n_replicates - i * shard_size) for i in range(n_shards)]
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
 
-print(f"Sample size: {n}")
-print(f"Sample mean: {np.mean(data):.4f}")
-print(f"Sample std: {np.std(data, ddof=1):.4f}\n")
+    if n_workers == 1:
+        results = list(map(shard, sizes, seeds))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(shard, sizes, seeds))
 
-# Key Concept 1: Nonparametric Bootstrap
-print("--- Nonparametric Bootstrap ---")
-print("Resample from observed data with replacement\n")
+    return np.concatenate(results)
 
-n_bootstrap = 10000
 
-def bootstrap_resample(data, statistic, n_bootstrap=10000):
+def bootstrap_resample(data, statistic, n_bootstrap=10000, batch=None,
+                       max_batch_bytes=2**27, seed=None, n_workers=1,
+                       shard_size=10000):
     """
     Perform bootstrap resampling
 
@@ -33,123 +175,683 @@ def bootstrap_resample(data, statistic, n_bootstrap=10000):
     -----------
     data : array
         Original sample
+    statistic : callable
+        Function to compute on each bootstrap sample. Must be picklable
+        (not a lambda) when n_workers is not 1
+    n_bootstrap : int
+        Number of bootstrap samples
+    batch : bool or None
+        If True, draw a (B, n) index matrix and call statistic(chunk, axis=1)
+        on whole chunks of resamples. If False, loop over resamples one at a
+        time. If None, use batch mode when the statistic supports axis
+    max_batch_bytes : int
+        Memory budget for one chunk of indices plus resampled values
+    seed : int or None
+        Seed for independent per-shard RNG streams. If None and n_workers
+        is 1, the global NumPy RNG is used
+    n_workers : int or None
+        Number of worker processes (None uses all CPUs)
+    shard_size : int
+        Replicates per shard; together with seed it fixes the result
+
+    Returns:
+    --------
+    bootstrap_statistics : array
+        Bootstrap distribution of statistic
+    """
+    data = np.asarray(data)
+
+    if batch is None:
+        batch = supports_axis(statistic, data)
+
+    shard = partial(resample_shard, data, statistic, batch, max_batch_bytes)
+
+    if seed is None and n_workers == 1:
+        return shard(n_bootstrap)
+
+    return run_shards(shard, n_bootstrap, seed, n_workers, shard_size)
+
+
+def parametric_bootstrap(dist, n, statistic, n_bootstrap=10000, batch=None,
+                         max_batch_bytes=2**27, seed=None, n_workers=1,
+                         shard_size=10000):
+    """
+    Perform parametric bootstrap from a fitted distribution
+
+    Parameters:
+    -----------
+    dist : frozen scipy.stats distribution
+        Fitted model, e.g. stats.norm(fitted_mean, fitted_std)
+    n : int
+        Size of each simulated sample
+    statistic : callable
+        Function to compute on each simulated sample
+    n_bootstrap, batch, max_batch_bytes, seed, n_workers, shard_size :
+        As in bootstrap_resample
+
+    Returns:
+    --------
+    bootstrap_statistics : array
+        Parametric bootstrap distribution of statistic
+    """
+    if batch is None:
+        # Deterministic probe sample from the model's quantiles
+        batch = supports_axis(statistic, dist.ppf((np.arange(n) + 0.5) / n))
+
+    shard = partial(parametric_shard, dist, n, statistic, batch, max_batch_bytes)
+
+    if seed is None and n_workers == 1:
+        return shard(n_bootstrap)
+
+    return run_shards(shard, n_bootstrap, seed, n_workers, shard_size)
+
+def optimal_block_length(data, method="stationary"):
+    """
+    Automatic block length (Politis and White, 2004, with the Patton,
+    Politis and White, 2009 correction)
+
+    Parameters:
+    -----------
+    data : array
+        Time series
+    method : str
+        "stationary" for the stationary bootstrap, "moving" or "circular"
+        for fixed-length blocks
+
+    Returns:
+    --------
+    block_length : int
+        Estimated optimal (expected) block length
+    """
+    data = np.asarray(data, dtype=float)
+    n = len(data)
+    centered = data - data.mean()
+
+    # Autocovariances for all lags at once via FFT
+    spectrum = np.abs(np.fft.rfft(centered, 2 * n))**2
+    acov = np.fft.irfft(spectrum)[:n] / n
+    acf = acov / acov[0]
+
+    # Smallest lag m after which K_n autocorrelations are insignificant
+    k_n = max(5, int(np.ceil(np.sqrt(np.log10(n)))))
+    max_lag = min(int(np.ceil(np.sqrt(n))) + k_n, n - 1)
+    threshold = 2 * np.sqrt(np.log10(n) / n)
+    insignificant = np.abs(acf[1:max_lag + 1]) < threshold
+    m = max_lag - k_n
+    for lag in range(max_lag - k_n + 1):
+        if insignificant[lag:lag + k_n].all():
+            m = lag
+            break
+    big_m = min(2 * max(m, 1), max_lag)
+
+    # Flat-top lag window
+    lags = np.arange(-big_m, big_m + 1)
+    t = np.abs(lags) / big_m
+    weights = np.where(t <= 0.5, 1.0, 2 * (1 - t))
+    gammas = acov[np.abs(lags)]
+    g = np.sum(weights * np.abs(lags) * gammas)
+    spectral_0 = np.sum(weights * gammas)
+
+    d = 2 * spectral_0**2 if method == "stationary" else 4 / 3 * spectral_0**2
+    block_length = (2 * g**2 / d)**(1 / 3) * n**(1 / 3)
+    return int(np.clip(np.ceil(block_length), 1, max(1, min(3 * np.sqrt(n), n / 3))))
+
+
+def block_shard(data, statistic, block_length, method, batch, max_batch_bytes,
+                n_replicates, seed_seq=None):
+    """
+    Block bootstrap for one shard of replicates
+
+    Block start indices for every replicate are drawn in one call. Moving
+    and circular blocks are gathered from a sliding-window view of the
+    series, so each resample is a reshape of the selected windows.
+    Stationary blocks have geometric lengths with mean block_length and
+    are built with cumulative index arithmetic.
+    """
+    n = len(data)
+    rng = np.random if seed_seq is None else np.random.default_rng(seed_seq)
+    randint = np.random.randint if seed_seq is None else rng.integers
+    n_blocks = -(-n // block_length)
+
+    if method == "circular":
+        wrapped = np.concatenate([data, data[:block_length - 1]])
+        windows = np.lib.stride_tricks.sliding_window_view(wrapped, block_length)
+    else:
+        windows = np.lib.stride_tricks.sliding_window_view(data, block_length)
+
+    def draw(rows):
+        if method == "stationary":
+            starts = randint(0, n, size=(rows, n))
+            new_block = rng.random((rows, n)) < 1 / block_length
+            new_block[:, 0] = True
+            # Position where the current block began, for every position
+            positions = np.arange(n)
+            block_begin = np.where(new_block, positions, 0)
+            del new_block
+            np.maximum.accumulate(block_begin, axis=1, out=block_begin)
+            # Reuse buffers in place: at most three int64 arrays are alive
+            index = np.take_along_axis(starts, block_begin, axis=1)
+            del starts
+            index -= block_begin
+            del block_begin
+            index += positions
+            index %= n
+            return data[index]
+
+        starts = randint(0, len(windows), size=(rows, n_blocks))
+        return windows[starts].reshape(rows, -1)[:, :n]
+
+    # Stationary blocks hold starts, block_begin and the index at once
+    bytes_per_element = 24 if method == "stationary" else 16
+    return apply_in_chunks(draw, statistic, n_replicates, n, batch,
+                           max_batch_bytes, bytes_per_element)
+
+
+def block_bootstrap(data, statistic, n_bootstrap=10000, block_length=None,
+                    method="moving", batch=None, max_batch_bytes=2**27,
+                    seed=None, n_workers=1, shard_size=10000):
+    """
+    Block bootstrap for autocorrelated series
+
+    Parameters:
+    -----------
+    data : array
+        Time series
     statistic : callable
         Function to compute on each bootstrap sample
     n_bootstrap : int
         Number of bootstrap samples
+    block_length : int or None
+        Block length (mean block length for "stationary"). If None, chosen
+        by optimal_block_length
+    method : str
+        "moving", "circular" or "stationary"
+    batch, max_batch_bytes, seed, n_workers, shard_size :
+        As in bootstrap_resample
+
+    Returns:
+    --------
+    bootstrap_statistics : array
+        Bootstrap distribution of statistic
+    """
+    if method not in ("moving", "circular", "stationary"):
+        raise ValueError("method must be 'moving', 'circular' or 'stationary'")
+
+    data = np.asarray(data)
+
+    if block_length is None:
+        block_length = optimal_block_length(data, method)
+
+    if batch is None:
+        batch = supports_axis(statistic, data)
+
+    shard = partial(block_shard, data, statistic, block_length, method, batch,
+                    max_batch_bytes)
+
+    if seed is None and n_workers == 1:
+        return shard(n_bootstrap)
+
+    return run_shards(shard, n_bootstrap, seed, n_workers, shard_size)
+
+
+def iter_chunks(source, chunk_size=2**16):
+    """
+    Yield consecutive chunks of observations from a data source
+
+    Parameters:
+    -----------
+    source : array, memmap, str or iterable
+        An array (including np.memmap), a path to a .npy file which is
+        memory-mapped, or any iterable that already yields chunks
+    chunk_size : int
+        Rows per chunk when slicing an array or file
+
+    Yields:
+    -------
+    chunk : array
+        Next block of rows, read lazily from disk for memory-mapped input
+    """
+    if isinstance(source, str):
+        source = np.load(source, mmap_mode='r')
+
+    if isinstance(source, np.ndarray):
+        for start in range(0, len(source), chunk_size):
+            yield np.asarray(source[start:start + chunk_size], dtype=float)
+    else:
+        for chunk in source:
+            yield np.asarray(chunk, dtype=float)
+
+
+def poisson_bootstrap(source, statistic="mean", n_bootstrap=10000, seed=None,
+                      chunk_size=2**16, max_batch_bytes=2**27, ddof=1):
+    """
+    Single-pass streaming bootstrap with Poisson(1) weights
+
+    Every observation gets an independent Poisson(1) count in each of the
+    B replicates, which approximates multinomial resampling for large n.
+    Only weighted sufficient statistics are kept, so memory is O(B) no
+    matter how many rows are streamed.
+
+    Parameters:
+    -----------
+    source : array, memmap, str or iterable
+        Data, passed through iter_chunks. For statistic="ratio" each row
+        holds (numerator, denominator)
+    statistic : str
+        "mean", "var" or "ratio" (sum of numerators / sum of denominators)
+    n_bootstrap : int
+        Number of bootstrap replicates B
+    seed : int or None
+        Seed for a private Generator. If None, the global NumPy RNG is used
+    chunk_size : int
+        Rows read from an array or file at a time
+    max_batch_bytes : int
+        Memory budget for the (B, rows) weight matrix of one chunk
+    ddof : int
+        Delta degrees of freedom for statistic="var"
 
     Returns:
     --------
     bootstrap_statistics : array
         Bootstrap distribution of statistic
     """
-    bootstrap_stats = []
+    if statistic not in ("mean", "var", "ratio"):
+        raise ValueError("statistic must be 'mean', 'var' or 'ratio'")
+
+    poisson = np.random.poisson if seed is None else \
+        np.random.default_rng(seed).poisson
+    rows_per_batch = max(1, max_batch_bytes // (16 * n_bootstrap))
+
+    # Weighted sufficient statistics per replicate
+    sum_w = np.zeros(n_bootstrap)
+    sum_wx = np.zeros(n_bootstrap)
+    sum_wxx = np.zeros(n_bootstrap)
+    sum_wy = np.zeros(n_bootstrap)
+    # Mean and variance sums are taken around the first observation seen,
+    # so the variance does not cancel when the data sit far from 0
+    shift = None
+
+    for chunk in iter_chunks(source, chunk_size):
+        if shift is None and len(chunk) > 0:
+            shift = 0.0 if statistic == "ratio" else chunk[0]
+        for start in range(0, len(chunk), rows_per_batch):
+            block = chunk[start:start + rows_per_batch]
+            weights = poisson(1.0, size=(n_bootstrap, len(block))).astype(float)
+            sum_w += weights.sum(axis=1)
+
+            if statistic == "ratio":
+                sum_wx += weights @ block[:, 0]
+                sum_wy += weights @ block[:, 1]
+            else:
+                block = block - shift
+                sum_wx += weights @ block
+                sum_wxx += weights @ (block * block)
+
+    if shift is None:
+        raise ValueError("source yielded no observations")
+    if statistic == "ratio":
+        return sum_wx / sum_wy
+
+    shifted_means = sum_wx / sum_w
+    if statistic == "mean":
+        return shifted_means + shift
+
+    return (sum_wxx - sum_w * shifted_means**2) / (sum_w - ddof)
+
+
+def moment_statistic(statistic):
+    """
+    Identify np.mean, np.sum, np.var and np.std, optionally wrapped in
+    functools.partial with ddof
+
+    Returns:
+    --------
+    func : callable or None
+        The NumPy function, or None for any other statistic
+    ddof : int
+        Delta degrees of freedom passed through partial
+    """
+    func, args, kwargs = statistic, (), {}
+    if isinstance(statistic, partial):
+        func, args, kwargs = statistic.func, statistic.args, statistic.keywords
+
+    if func in (np.mean, np.sum) and not args and not kwargs:
+        return func, 0
+    if func in (np.var, np.std) and not args and set(kwargs) <= {"ddof"}:
+        return func, kwargs.get("ddof", 0)
+    return None, 0
+
+
+def jackknife(data, statistic, max_batch_bytes=2**27):
+    """
+    Leave-one-out jackknife values of a statistic
+
+    np.mean, np.sum, np.var and np.std (optionally wrapped in
+    functools.partial with ddof) are computed in O(n) by downdating the
+    full-sample sums. Other statistics fall back to n refits, batched
+    over a leave-one-out index matrix when the statistic supports axis.
+
+    Parameters:
+    -----------
+    data : array
+        Original sample
+    statistic : callable
+        Function of a sample
+    max_batch_bytes : int
+        Memory budget for one chunk of the leave-one-out matrix
+
+    Returns:
+    --------
+    jackknife_values : array
+        statistic(data without observation i) for each i
+    """
+    data = np.asarray(data, dtype=float)
     n = len(data)
 
-    for _ in range(n_bootstrap):
-        # Resample with replacement
-        bootstrap_sample = np.random.choice(data, size=n, replace=True)
-        stat = statistic(bootstrap_sample)
-        bootstrap_stats.append(stat)
+    func, ddof = moment_statistic(statistic)
 
-    return np.array(bootstrap_stats)
+    if func in (np.mean, np.sum):
+        loo_sums = data.sum() - data
+        return loo_sums / (n - 1) if func is np.mean else loo_sums
 
-# Bootstrap distribution of the mean
-bootstrap_means = bootstrap_resample(data, np.mean, n_bootstrap)
+    if func in (np.var, np.std):
+        # Center first so the downdated sums of squares stay accurate
+        centered = data - data.mean()
+        loo_sums = centered.sum() - centered
+        loo_squares = (centered**2).sum() - centered**2
+        loo_vars = (loo_squares - loo_sums**2 / (n - 1)) / (n - 1 - ddof)
+        return loo_vars if func is np.var else np.sqrt(loo_vars)
 
-print(f"Bootstrap mean of means: {np.mean(bootstrap_means):.4f}")
-print(f"Bootstrap SE of mean: {np.std(bootstrap_means):.4f}")
-print(f"Theoretical SE: {true_std/np.sqrt(n):.4f}\n")
+    if supports_axis(statistic, data):
+        # Row i of the index matrix skips observation i
+        cols = np.arange(n - 1)
+        rows_per_chunk = max(1, min(n, max_batch_bytes // (16 * n)))
+        jackknife_values = np.empty(n)
 
-# 95% Confidence Interval (percentile method)
-ci_lower = np.percentile(bootstrap_means, 2.5)
-ci_upper = np.percentile(bootstrap_means, 97.5)
+        for start in range(0, n, rows_per_chunk):
+            rows = np.arange(start, min(start + rows_per_chunk, n))
+            idx = cols + (cols >= rows[:, None])
+            jackknife_values[rows] = statistic(data[idx], axis=1)
 
-print(f"95% Bootstrap CI (percentile): [{ci_lower:.4f}, {ci_upper:.4f}]")
-print(f"Sample mean: {np.mean(data):.4f}\n")
+        return jackknife_values
 
-# Key Concept 2: Bootstrap for other statistics
-print("--- Bootstrap for Median and Std Dev ---\n")
+    return np.array([statistic(np.delete(data, i)) for i in range(n)])
 
-bootstrap_medians = bootstrap_resample(data, np.median, n_bootstrap)
-bootstrap_stds = bootstrap_resample(data, lambda x: np.std(x, ddof=1), n_bootstrap)
 
-print(f"Median: {np.median(data):.4f}")
-print(f"  Bootstrap SE: {np.std(bootstrap_medians):.4f}")
-print(f"  95% CI: [{np.percentile(bootstrap_medians, 2.5):.4f}, "
-      f"{np.percentile(bootstrap_medians, 97.5):.4f}]\n")
+def jackknife_se(data, statistic):
+    """Jackknife standard error of a statistic"""
+    values = jackknife(data, statistic)
+    n = len(values)
+    return np.sqrt((n - 1) / n * np.sum((values - values.mean())**2))
 
-print(f"Std Dev: {np.std(data, ddof=1):.4f}")
-print(f"  Bootstrap SE: {np.std(bootstrap_stds):.4f}")
-print(f"  95% CI: [{np.percentile(bootstrap_stds, 2.5):.4f}, "
-      f"{np.percentile(bootstrap_stds, 97.5):.4f}]\n")
 
-# Key Concept 3: Parametric Bootstrap
-print("--- Parametric Bootstrap ---")
-print("Fit model, then sample from fitted model\n")
+def mean_se(sample, axis=None):
+    """Standard error of the sample mean"""
+    sample = np.asarray(sample)
+    size = sample.size if axis is None else sample.shape[axis]
+    return np.std(sample, ddof=1, axis=axis) / np.sqrt(size)
 
-# Fit normal distribution
-fitted_mean = np.mean(data)
-fitted_std = np.std(data, ddof=1)
 
-parametric_means = []
-for _ in range(n_bootstrap):
+def studentized_statistic(sample, statistic, se, theta_hat, axis=None):
+    """Bootstrap-t pivot (statistic - theta_hat) / se for one or many resamples"""
+    if axis is None:
+        return (statistic(sample) - theta_hat) / se(sample)
+    return (statistic(sample, axis=axis) - theta_hat) / se(sample, axis=axis)
+
+
+def bootstrap_ci(data, statistic, n_bootstrap=10000, alpha=0.05,
+                 method="percentile", se=None, **kwargs):
+    """
+    Bootstrap confidence interval
+
+    Parameters:
+    -----------
+    data : array
+        Original sample
+    statistic : callable
+        Function to compute on each bootstrap sample
+    n_bootstrap : int
+        Number of bootstrap samples
+    alpha : float
+        1 - confidence level
+    method : str
+        "percentile", "bca" (bias-corrected and accelerated, with the
+        acceleration taken from jackknife) or "studentized" (bootstrap-t)
+    se : callable, optional
+        se(sample) giving the standard error of statistic, used by
+        "studentized". Defaults to mean_se for np.mean and to the
+        jackknife standard error for np.sum, np.var and np.std. Required
+        for any other statistic: the jackknife is zero on many resamples
+        of non-smooth statistics such as the median
+    **kwargs :
+        batch, max_batch_bytes, seed, n_workers, shard_size passed on to
+        bootstrap_resample
+
+    Returns:
+    --------
+    (lower, upper) : tuple of float
+        Confidence interval limits
+    """
+    data = np.asarray(data, dtype=float)
+    theta_hat = statistic(data)
+
+    if method == "percentile":
+        boot = bootstrap_resample(data, statistic, n_bootstrap, **kwargs)
+        return (np.percentile(boot, 100 * alpha / 2),
+                np.percentile(boot, 100 * (1 - alpha / 2)))
+
+    if method == "bca":
+        boot = bootstrap_resample(data, statistic, n_bootstrap, **kwargs)
+
+        # Bias correction from the mid-rank of the estimate among the
+        # replicates, so ties in discrete bootstrap distributions count half
+        z0 = stats.norm.ppf(np.mean(boot < theta_hat) + 0.5 * np.mean(boot == theta_hat))
+
+        # Acceleration from the skewness of the jackknife values
+        jack = jackknife(data, statistic)
+        diffs = jack.mean() - jack
+        a = np.sum(diffs**3) / (6 * np.sum(diffs**2)**1.5)
+
+        z = stats.norm.ppf([alpha / 2, 1 - alpha / 2])
+        adjusted = stats.norm.cdf(z0 + (z0 + z) / (1 - a * (z0 + z)))
+        lower, upper = np.percentile(boot, 100 * adjusted)
+        return lower, upper
+
+    if method == "studentized":
+        if se is None:
+            if moment_statistic(statistic)[0] is None:
+                raise ValueError("studentized intervals need se for statistics other "
+                                 "than np.mean, np.sum, np.var and np.std")
+            se = mean_se if statistic is np.mean else \
+                partial(jackknife_se, statistic=statistic)
+
+        pivot = partial(studentized_statistic, statistic=statistic, se=se,
+                        theta_hat=theta_hat)
+        t_stats = bootstrap_resample(data, pivot, n_bootstrap, **kwargs)
+        se_hat = se(data)
+        t_lower, t_upper = np.percentile(t_stats, [100 * alpha / 2,
+                                                   100 * (1 - alpha / 2)])
+        return theta_hat - t_upper * se_hat, theta_hat - t_lower * se_hat
+
+    raise ValueError("method must be 'percentile', 'bca' or 'studentized'")
+
+
+if __name__ == "__main__":
+    print("=== Bootstrap Resampling ===\n")
+
+    # Generate sample data
+    np.random.seed(42)
+    n = 50
+    true_mean = 10
+    true_std = 3
+    data = np.random.normal(true_mean, true_std, n)
+
+    print(f"Sample size: {n}")
+    print(f"Sample mean: {np.mean(data):.4f}")
+    print(f"Sample std: {np.std(data, ddof=1):.4f}\n")
+
+    # Key Concept 1: Nonparametric Bootstrap
+    print("--- Nonparametric Bootstrap ---")
+    print("Resample from observed data with replacement\n")
+
+    n_bootstrap = 10000
+
+    # Bootstrap distribution of the mean
+    bootstrap_means = bootstrap_resample(data, np.mean, n_bootstrap)
+
+    print(f"Bootstrap mean of means: {np.mean(bootstrap_means):.4f}")
+    print(f"Bootstrap SE of mean: {np.std(bootstrap_means):.4f}")
+    print(f"Theoretical SE: {true_std/np.sqrt(n):.4f}\n")
+
+    # 95% Confidence Interval (percentile method)
+    ci_lower = np.percentile(bootstrap_means, 2.5)
+    ci_upper = np.percentile(bootstrap_means, 97.5)
+
+    print(f"95% Bootstrap CI (percentile): [{ci_lower:.4f}, {ci_upper:.4f}]")
+    print(f"Sample mean: {np.mean(data):.4f}\n")
+
+    # Key Concept 2: Bootstrap for other statistics
+    print("--- Bootstrap for Median and Std Dev ---\n")
+
+    bootstrap_medians = bootstrap_resample(data, np.median, n_bootstrap)
+    bootstrap_stds = bootstrap_resample(data, partial(np.std, ddof=1), n_bootstrap)
+
+    print(f"Median: {np.median(data):.4f}")
+    print(f"  Bootstrap SE: {np.std(bootstrap_medians):.4f}")
+    print(f"  95% CI: [{np.percentile(bootstrap_medians, 2.5):.4f}, "
+          f"{np.percentile(bootstrap_medians, 97.5):.4f}]\n")
+
+    print(f"Std Dev: {np.std(data, ddof=1):.4f}")
+    print(f"  Bootstrap SE: {np.std(bootstrap_stds):.4f}")
+    print(f"  95% CI: [{np.percentile(bootstrap_stds, 2.5):.4f}, "
+          f"{np.percentile(bootstrap_stds, 97.5):.4f}]\n")
+
+    # Key Concept 3: Parametric Bootstrap
+    print("--- Parametric Bootstrap ---")
+    print("Fit model, then sample from fitted model\n")
+
+    # Fit normal distribution
+    fitted_mean = np.mean(data)
+    fitted_std = np.std(data, ddof=1)
+
     # Sample from fitted model
-    parametric_sample = np.random.normal(fitted_mean, fitted_std, n)
-    parametric_means.append(np.mean(parametric_sample))
-
-parametric_means = np.array(parametric_means)
-
-print(f"Parametric bootstrap mean: {np.mean(parametric_means):.4f}")
-print(f"Parametric bootstrap SE: {np.std(parametric_means):.4f}")
-print(f"95% CI: [{np.percentile(parametric_means, 2.5):.4f}, "
-      f"{np.percentile(parametric_means, 97.5):.4f}]\n")
-
-# Visualization
-fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-
-# Plot 1: Original data
-axes[0, 0].hist(data, bins=15, density=True, alpha=0.7, edgecolor='black')
-x_range = np.linspace(data.min(), data.max(), 100)
-axes[0, 0].plot(x_range, stats.norm.pdf(x_range, fitted_mean, fitted_std),
-                'r-', linewidth=2, label='Fitted Normal')
-axes[0, 0].axvline(np.mean(data), color='blue', linestyle='--', linewidth=2, label='Sample mean')
-axes[0, 0].set_xlabel('Value')
-axes[0, 0].set_ylabel('Density')
-axes[0, 0].set_title('Original Data')
-axes[0, 0].legend()
-
-# Plot 2: Bootstrap distribution of mean
-axes[0, 1].hist(bootstrap_means, bins=50, density=True, alpha=0.7, edgecolor='black')
-axes[0, 1].axvline(np.mean(data), color='r', linestyle='--', linewidth=2, label='Sample mean')
-axes[0, 1].axvline(ci_lower, color='g', linestyle='--', linewidth=2, label='95% CI')
-axes[0, 1].axvline(ci_upper, color='g', linestyle='--', linewidth=2)
-axes[0, 1].set_xlabel('Mean')
-axes[0, 1].set_ylabel('Density')
-axes[0, 1].set_title('Bootstrap Distribution of Mean')
-axes[0, 1].legend()
-
-# Plot 3: Bootstrap distributions comparison
-axes[1, 0].hist(bootstrap_medians, bins=50, density=True, alpha=0.5,
-                edgecolor='black', label='Median')
-axes[1, 0].hist(bootstrap_means, bins=50, density=True, alpha=0.5,
-                edgecolor='black', label='Mean')
-axes[1, 0].set_xlabel('Value')
-axes[1, 0].set_ylabel('Density')
-axes[1, 0].set_title('Bootstrap Distributions: Mean vs Median')
-axes[1, 0].legend()
-
-# Plot 4: Nonparametric vs Parametric Bootstrap
-axes[1, 1].hist(bootstrap_means, bins=50, density=True, alpha=0.5,
-                edgecolor='black', label='Nonparametric')
-axes[1, 1].hist(parametric_means, bins=50, density=True, alpha=0.5,
-                edgecolor='black', label='Parametric')
-axes[1, 1].set_xlabel('Mean')
-axes[1, 1].set_ylabel('Density')
-axes[1, 1].set_title('Nonparametric vs Parametric Bootstrap')
-axes[1, 1].legend()
-
-plt.tight_layout()
-plt.savefig('/home/titan/pdfs/notes/statisticalComputingAndReporting/groupWork/answers/12.Bootstrap/bootstrap.png', dpi=150)
-print("Visualization saved as bootstrap.png")
-plt.close()
+    parametric_means = parametric_bootstrap(stats.norm(fitted_mean, fitted_std), n,
+                                            np.mean, n_bootstrap)
+
+    print(f"Parametric bootstrap mean: {np.mean(parametric_means):.4f}")
+    print(f"Parametric bootstrap SE: {np.std(parametric_means):.4f}")
+    print(f"95% CI: [{np.percentile(parametric_means, 2.5):.4f}, "
+          f"{np.percentile(parametric_means, 97.5):.4f}]\n")
+
+    # Key Concept 4: Parallel bootstrap with independent RNG streams
+    print("--- Parallel Bootstrap ---")
+    print("Each shard of replicates gets its own SeedSequence child stream\n")
+
+    serial_means = bootstrap_resample(data, np.mean, n_bootstrap, seed=2024)
+    parallel_means = bootstrap_resample(data, np.mean, n_bootstrap, seed=2024,
+                                        n_workers=4)
+    print(f"Serial SE: {np.std(serial_means):.4f}")
+    print(f"Parallel SE (4 workers): {np.std(parallel_means):.4f}")
+    print(f"Bit-identical: {np.array_equal(serial_means, parallel_means)}\n")
+
+    # Key Concept 5: Streaming Poisson bootstrap
+    print("--- Streaming Poisson Bootstrap ---")
+    print("One pass over chunks with Poisson(1) weights per replicate\n")
+
+    # Data arrives in chunks, e.g. from a memory-mapped file
+    stream = (data[i:i + 10] for i in range(0, n, 10))
+    poisson_means = poisson_bootstrap(stream, "mean", n_bootstrap, seed=2024)
+    poisson_vars = poisson_bootstrap(data, "var", n_bootstrap, seed=2024,
+                                     chunk_size=10)
+    print(f"Poisson bootstrap SE of mean: {np.std(poisson_means):.4f}")
+    print(f"Poisson bootstrap SE of variance: {np.std(poisson_vars):.4f}")
+
+    # Ratio estimator: rows of (numerator, denominator)
+    pairs = np.column_stack([data, np.random.uniform(1, 2, n)])
+    poisson_ratios = poisson_bootstrap(pairs, "ratio", n_bootstrap, seed=2024)
+    print(f"Ratio estimate: {pairs[:, 0].sum() / pairs[:, 1].sum():.4f}")
+    print(f"  95% CI: [{np.percentile(poisson_ratios, 2.5):.4f}, "
+          f"{np.percentile(poisson_ratios, 97.5):.4f}]\n")
+
+    # Key Concept 6: BCa and bootstrap-t intervals
+    print("--- BCa and Studentized Intervals ---")
+    print("Skewed data: percentile intervals tend to under-cover\n")
+
+    latency = np.random.exponential(scale=2.0, size=n)
+    for method in ["percentile", "bca", "studentized"]:
+        lower, upper = bootstrap_ci(latency, np.mean, n_bootstrap,
+                                    method=method, seed=2024)
+        print(f"{method:<12} 95% CI for mean: [{lower:.4f}, {upper:.4f}]")
+    print()
+
+    # Key Concept 7: Block bootstrap for time series
+    print("--- Block Bootstrap ---")
+    print("Resample blocks to keep the autocorrelation of an AR(1) series\n")
+
+    phi = 0.7
+    n_series = 2000
+    innovations = np.random.normal(0, 1, n_series)
+    series = np.zeros(n_series)
+    for t in range(1, n_series):
+        series[t] = phi * series[t - 1] + innovations[t]
+
+    # Var(mean) of AR(1) ~ sigma_x^2 (1 + phi) / (1 - phi) / n
+    print(f"Theoretical SE of mean: "
+          f"{np.sqrt((1 + phi) / (1 - phi) / (1 - phi**2) / n_series):.4f}")
+    print(f"iid bootstrap SE: "
+          f"{np.std(bootstrap_resample(series, np.mean, n_bootstrap)):.4f}")
+    for method in ["moving", "circular", "stationary"]:
+        block_means = block_bootstrap(series, np.mean, n_bootstrap,
+                                      method=method, seed=2024)
+        print(f"{method:<11} block SE (b={optimal_block_length(series, method)}): "
+              f"{np.std(block_means):.4f}")
+    print()
+
+    # Visualization
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+    # Plot 1: Original data
+    axes[0, 0].hist(data, bins=15, density=True, alpha=0.7, edgecolor='black')
+    x_range = np.linspace(data.min(), data.max(), 100)
+    axes[0, 0].plot(x_range, stats.norm.pdf(x_range, fitted_mean, fitted_std),
+                    'r-', linewidth=2, label='Fitted Normal')
+    axes[0, 0].axvline(np.mean(data), color='blue', linestyle='--', linewidth=2, label='Sample mean')
+    axes[0, 0].set_xlabel('Value')
+    axes[0, 0].set_ylabel('Density')
+    axes[0, 0].set_title('Original Data')
+    axes[0, 0].legend()
+
+    # Plot 2: Bootstrap distribution of mean
+    axes[0, 1].hist(bootstrap_means, bins=50, density=True, alpha=0.7, edgecolor='black')
+    axes[0, 1].axvline(np.mean(data), color='r', linestyle='--', linewidth=2, label='Sample mean')
+    axes[0, 1].axvline(ci_lower, color='g', linestyle='--', linewidth=2, label='95% CI')
+    axes[0, 1].axvline(ci_upper, color='g', linestyle='--', linewidth=2)
+    axes[0, 1].set_xlabel('Mean')
+    axes[0, 1].set_ylabel('Density')
+    axes[0, 1].set_title('Bootstrap Distribution of Mean')
+    axes[0, 1].legend()
+
+    # Plot 3: Bootstrap distributions comparison
+    axes[1, 0].hist(bootstrap_medians, bins=50, density=True, alpha=0.5,
+                    edgecolor='black', label='Median')
+    axes[1, 0].hist(bootstrap_means, bins=50, density=True, alpha=0.5,
+                    edgecolor='black', label='Mean')
+    axes[1, 0].set_xlabel('Value')
+    axes[1, 0].set_ylabel('Density')
+    axes[1, 0].set_title('Bootstrap Distributions: Mean vs Median')
+    axes[1, 0].legend()
+
+    # Plot 4: Nonparametric vs Parametric Bootstrap
+    axes[1, 1].hist(bootstrap_means, bins=50, density=True, alpha=0.5,
+                    edgecolor='black', label='Nonparametric')
+    axes[1, 1].hist(parametric_means, bins=50, density=True, alpha=0.5,
+                    edgecolor='black', label='Parametric')
+    axes[1, 1].set_xlabel('Mean')
+    axes[1, 1].set_ylabel('Density')
+    axes[1, 1].set_title('Nonparametric vs Parametric Bootstrap')
+    axes[1, 1].legend()
+
+    plt.tight_layout()
+    plt.savefig('/home/titan/pdfs/notes/statisticalComputingAndReporting/groupWork/answers/12.Bootstrap/bootstrap.png', dpi=150)
+    print("Visualization saved as bootstrap.png")
+    plt.close()
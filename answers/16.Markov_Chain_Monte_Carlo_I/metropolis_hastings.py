@@ -2,67 +2,880 @@
 Metropolis-Hastings Algorithm
 MCMC sampling using proposal distribution and acceptance probability
 """
+import os
+import tempfile
+import time
+from multiprocessing import Pipe, Process
+
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.stats import norm
 
-print("=== Metropolis-Hastings MCMC ===\n")
+from mcmc_diagnostics import autocorrelation, summarize
+from trace_storage import TraceSink
 
 # Target distribution: mixture of normals
 def target_density(x):
     return 0.3*norm.pdf(x, -2, 0.8) + 0.7*norm.pdf(x, 3, 1.5)
 
+def log_target_density(x):
+    """Log of target_density, computed stably in the tails"""
+    return np.logaddexp(np.log(0.3) + norm.logpdf(x, -2, 0.8),
+                        np.log(0.7) + norm.logpdf(x, 3, 1.5))
+
+class CountedTarget:
+    """
+    Wrap a density (or gradient) and count how many points it is evaluated at
+
+    n_evaluations grows by the number of points in each call, so a call on
+    a vector of chain states counts once per chain. Set ndim=1 when each
+    point is a vector, i.e. states are passed as (n_points, d) arrays.
+    """
+    def __init__(self, target, ndim=0):
+        self.target = target
+        self.ndim = ndim
+        self.n_evaluations = 0
+
+    def __call__(self, x):
+        self.n_evaluations += int(np.prod(np.shape(x)[:np.ndim(x) - self.ndim]))
+        return self.target(x)
+
 # Metropolis-Hastings algorithm
-def metropolis_hastings(target, n_iterations, proposal_std=1.0):
-    samples = np.zeros(n_iterations)
-    x_current = 0.0  # Initial value
-    n_accepted = 0
+def metropolis_hastings(target, n_iterations, proposal_std=1.0, n_chains=None,
+                        initial=0.0, log_density=False, block_size=1000,
+                        sink=None):
+    """
+    Random-walk Metropolis-Hastings sampler
+
+    The (log) density at the current state is cached, so each iteration
+    evaluates the target once, at the proposal. Acceptance compares
+    log(U) with the log density difference, which does not underflow in
+    the tails. Proposal steps and uniforms are drawn in blocks.
+
+    Parameters:
+    -----------
+    target : callable
+        Target density, known up to a constant, or its log if log_density
+        is True. Must accept arrays when n_chains is given
+    n_iterations : int
+        Number of iterations per chain
+    proposal_std : float
+        Standard deviation of the normal random-walk proposal
+    n_chains : int or None
+        If None, run one chain with a scalar loop. Otherwise advance
+        n_chains chains in lockstep, with proposals, density evaluations
+        and accept/reject decisions done as array operations
+    initial : float or array
+        Starting value, or one starting value per chain
+    log_density : bool
+        Whether target returns log density values
+    block_size : int
+        Iterations of random numbers drawn at a time
+    sink : TraceSink, optional
+        If given, each block of draws is written to this on-disk sink
+        (which applies burn-in and thinning) instead of being kept in RAM
+
+    Returns:
+    --------
+    samples : array
+        Shape (n_iterations,) for one chain, (n_chains, n_iterations) otherwise.
+        With a sink, the sink's memory-mapped draws
+    acceptance_rate : float or array
+        Acceptance rate, one per chain in multi-chain mode
+    """
+    if log_density:
+        log_target = target
+    else:
+        def log_target(x):
+            with np.errstate(divide='ignore'):
+                return np.log(target(x))
 
-    for i in range(n_iterations):
-        # Propose new value
-        x_proposed = x_current + np.random.normal(0, proposal_std)
+    shape = () if n_chains is None else (n_chains,)
+    if sink is None:
+        samples = np.zeros(shape + (n_iterations,))
+    else:
+        buffer = np.zeros(shape + (block_size,))
+    x_current = np.broadcast_to(np.asarray(initial, dtype=float), shape).copy()
+    log_p_current = log_target(x_current)
+    n_accepted = np.zeros(shape)
 
-        # Acceptance probability
-        alpha = min(1, target(x_proposed) / target(x_current))
+    if n_chains is None:
+        x_current, log_p_current = float(x_current), float(log_p_current)
 
-        # Accept or reject
-        if np.random.rand() < alpha:
-            x_current = x_proposed
-            n_accepted += 1
+    for block_start in range(0, n_iterations, block_size):
+        block = min(block_size, n_iterations - block_start)
+        steps = np.random.normal(0, proposal_std, shape + (block,))
+        log_u = np.log(np.random.rand(*shape, block))
+        if sink is None:
+            out = samples[..., block_start:block_start + block]
+        else:
+            out = buffer[..., :block]
 
-        samples[i] = x_current
+        if n_chains is None:
+            for j in range(block):
+                # Propose new value
+                x_proposed = x_current + steps[j]
+                log_p_proposed = log_target(x_proposed)
+
+                # Accept with probability min(1, p(proposed) / p(current))
+                if log_u[j] < log_p_proposed - log_p_current:
+                    x_current, log_p_current = x_proposed, log_p_proposed
+                    n_accepted += 1
+
+                out[j] = x_current
+        else:
+            for j in range(block):
+                # Propose new values for all chains
+                x_proposed = x_current + steps[:, j]
+                log_p_proposed = log_target(x_proposed)
+
+                # Accept or reject chain by chain
+                accept = log_u[:, j] < log_p_proposed - log_p_current
+                x_current = np.where(accept, x_proposed, x_current)
+                log_p_current = np.where(accept, log_p_proposed, log_p_current)
+                n_accepted += accept
+
+                out[:, j] = x_current
+
+        if sink is not None:
+            sink.append(out)
 
     acceptance_rate = n_accepted / n_iterations
+    if n_chains is None:
+        acceptance_rate = float(acceptance_rate)
+    if sink is not None:
+        sink.flush()
+        return sink.draws, acceptance_rate
+    return samples, acceptance_rate
+
+
+def chain_starts(initial, n_chains, scalar_target=None):
+    """
+    Starting states as an (n_chains, d) array
+
+    A scalar initial, or an (n_chains, 1) array with one start per chain,
+    means a scalar target. A 1-D initial is a single (d,) point shared by
+    all chains; a 1-D initial of length n_chains is ambiguous and must
+    come with scalar_target, True for per-chain scalar starts or False
+    for a d = n_chains target.
+
+    Returns:
+    --------
+    x : array
+        (n_chains, d) starting states, d = 1 for a scalar target
+    scalar : bool
+        Whether the target takes scalar states
+    """
+    n_c = 1 if n_chains is None else n_chains
+    initial = np.asarray(initial, dtype=float)
+    if scalar_target is None:
+        if initial.ndim == 1 and n_c > 1 and len(initial) == n_c:
+            raise ValueError("initial of length n_chains could be per-chain scalar "
+                             "starts or one shared point; pass scalar_target")
+        scalar_target = initial.ndim == 0 or initial.shape == (n_c, 1)
+
+    if scalar_target:
+        x = initial.reshape(-1, 1)
+    else:
+        x = initial.reshape(1, -1) if initial.ndim <= 1 else initial
+    return np.broadcast_to(x, (n_c, x.shape[-1])).copy(), scalar_target
+
+
+def adaptive_metropolis(log_target, n_iterations, initial, n_burnin=2000,
+                        n_chains=None, target_accept=None, proposal_std=1.0,
+                        adapt_interval=50, block_size=1000, scalar_target=None):
+    """
+    Adaptive random-walk Metropolis with a frozen kernel after burn-in
+
+    During burn-in each chain's proposal scale follows a Robbins-Monro
+    recursion toward target_accept, and the proposal covariance follows
+    the empirical covariance of the draws so far (Haario et al., 2001),
+    pooled over chains and refactored every adapt_interval iterations.
+    After burn-in the kernel is frozen, so the kept draws come from an
+    ordinary Metropolis-Hastings chain.
+
+    Parameters:
+    -----------
+    log_target : callable
+        Log density. Takes an (n_chains, d) array of states, or an
+        (n_chains,) array for a scalar target, and returns one value per
+        chain
+    n_iterations : int
+        Number of draws kept per chain after burn-in
+    initial : float or array
+        Starting point: scalar, (d,) or (n_chains, d), or one scalar per
+        chain as an (n_chains, 1) array (see chain_starts)
+    n_burnin : int
+        Adaptation iterations, discarded
+    n_chains : int or None
+        Number of chains advanced in lockstep (None for one chain)
+    target_accept : float or None
+        Acceptance rate to aim for; 0.44 in one dimension and 0.234
+        otherwise by default
+    proposal_std : float
+        Starting proposal scale
+    adapt_interval : int
+        Iterations between updates of the proposal covariance factor
+    block_size : int
+        Iterations of random numbers drawn at a time
+    scalar_target : bool or None
+        Whether log_target takes scalar states; None reads it from initial
+        as described in chain_starts
+
+    Returns:
+    --------
+    samples : array
+        Shape (n_iterations, d), or (n_chains, n_iterations, d) with several
+        chains; the d axis is dropped for a scalar target
+    acceptance_rate : float or array
+        Acceptance rate after burn-in, one per chain in multi-chain mode
+    scale : float or array
+        Frozen proposal scale per chain
+    cov : array
+        Frozen (d, d) proposal covariance shape, before scaling
+    """
+    x, scalar = chain_starts(initial, n_chains, scalar_target)
+    n_c, d = x.shape
+
+    if target_accept is None:
+        target_accept = 0.44 if d == 1 else 0.234
+
+    def evaluate(states):
+        return log_target(states[:, 0] if scalar else states)
+
+    log_p = evaluate(x)
+    log_scale = np.full(n_c, np.log(proposal_std))
+    chol = np.eye(d)
+    cov = np.eye(d)
+
+    # Pooled running mean and scatter matrix of burn-in draws (Welford)
+    count, mean, scatter = 0, np.zeros(d), np.zeros((d, d))
+
+    total = n_burnin + n_iterations
+    samples = np.zeros((n_c, n_iterations, d))
+    n_accepted = np.zeros(n_c)
+
+    for block_start in range(0, total, block_size):
+        block = min(block_size, total - block_start)
+        z = np.random.standard_normal((block, n_c, d))
+        log_u = np.log(np.random.rand(block, n_c))
+
+        for j in range(block):
+            i = block_start + j
+            x_proposed = x + np.exp(log_scale)[:, None] * (z[j] @ chol.T)
+            log_p_proposed = evaluate(x_proposed)
+            log_ratio = log_p_proposed - log_p
+
+            accept = log_u[j] < log_ratio
+            x = np.where(accept[:, None], x_proposed, x)
+            log_p = np.where(accept, log_p_proposed, log_p)
+
+            if i < n_burnin:
+                # Robbins-Monro step on the log scale
+                accept_prob = np.exp(np.minimum(0, log_ratio))
+                log_scale += (accept_prob - target_accept) / (i + 1)**0.6
+
+                # Merge this iteration's states into the pooled covariance
+                batch_mean = x.mean(axis=0)
+                centered = x - batch_mean
+                delta = batch_mean - mean
+                new_count = count + n_c
+                mean = mean + delta * n_c / new_count
+                scatter += centered.T @ centered + np.outer(delta, delta) * count * n_c / new_count
+                count = new_count
+
+                if (i + 1) % adapt_interval == 0 and count > 2 * d:
+                    cov = scatter / (count - 1) + 1e-10 * np.eye(d)
+                    chol = np.linalg.cholesky(cov)
+            else:
+                samples[:, i - n_burnin] = x
+                n_accepted += accept
+
+    acceptance_rate = n_accepted / n_iterations
+    scale = np.exp(log_scale)
+    if scalar:
+        samples = samples[..., 0]
+    if n_chains is None:
+        return samples[0], float(acceptance_rate[0]), float(scale[0]), cov
+    return samples, acceptance_rate, scale, cov
+
+
+def tempered_segment(log_target, betas, x, log_p, proposal_stds, rngs, n_steps):
+    """
+    Random-walk Metropolis moves for a segment of the temperature ladder
+
+    All temperatures in the segment move in lockstep on the tempered log
+    density beta * log_target. Each temperature draws from its own
+    Generator, so results do not depend on how the ladder is split into
+    segments.
+
+    Returns:
+    --------
+    samples : array
+        (len(betas), n_steps) draws
+    x, log_p : array
+        Final states and their untempered log densities
+    n_accepted : array
+        Accepted moves per temperature
+    """
+    steps = np.array([rng.normal(0, 1, n_steps) for rng in rngs]) * proposal_stds[:, None]
+    log_u = np.log(np.array([rng.random(n_steps) for rng in rngs]))
+    samples = np.zeros((len(betas), n_steps))
+    n_accepted = np.zeros(len(betas))
+
+    for j in range(n_steps):
+        x_proposed = x + steps[:, j]
+        log_p_proposed = log_target(x_proposed)
+
+        accept = log_u[:, j] < betas * (log_p_proposed - log_p)
+        x = np.where(accept, x_proposed, x)
+        log_p = np.where(accept, log_p_proposed, log_p)
+        n_accepted += accept
+
+        samples[:, j] = x
+
+    return samples, x, log_p, n_accepted
+
+
+def tempering_worker(connection, log_target, betas, proposal_stds, rngs, n_iterations):
+    """
+    Worker process that owns one ladder segment and its Generators
+
+    Each round it receives (x, log_p, n_steps) for its segment, runs
+    tempered_segment and sends back only the new x and log_p. Draws stay
+    in the worker until a None message asks for them.
+    """
+    samples = np.zeros((len(betas), n_iterations))
+    n_accepted = np.zeros(len(betas))
+    done = 0
+    while (message := connection.recv()) is not None:
+        x, log_p, n_steps = message
+        samples[:, done:done + n_steps], x, log_p, accepted = tempered_segment(
+            log_target, betas, x, log_p, proposal_stds, rngs, n_steps)
+        n_accepted += accepted
+        done += n_steps
+        connection.send((x, log_p))
+    connection.send((samples, n_accepted))
+    connection.close()
+
+
+def parallel_tempering(log_target, n_iterations, temperatures=None, n_temps=8,
+                       max_temp=50.0, proposal_std=1.0, initial=0.0,
+                       swap_interval=10, n_workers=1, seed=None):
+    """
+    Replica-exchange (parallel tempering) Metropolis sampler
+
+    A ladder of chains targets pi(x)^(1/T). The whole ladder moves as one
+    vectorized array, and every swap_interval iterations adjacent
+    temperatures propose to exchange states, alternating between even and
+    odd pairs. Hot chains cross between modes easily and pass those states
+    down to T = 1.
+
+    With n_workers, each worker process keeps its ladder segment and RNGs
+    for the whole run, and a swap round only exchanges the segment's
+    states and log densities, about 0.1 ms per worker. Every worker still
+    runs one Python loop step per iteration, so splitting the ladder only
+    pays off when the swap_interval target calls between swaps cost well
+    over that, e.g. a likelihood over a large data set, and there are
+    idle cores. For cheap targets such as the demo mixture keep
+    n_workers=1; a larger swap_interval also cuts the message count.
+
+    Parameters:
+    -----------
+    log_target : callable
+        Vectorized log density of the T = 1 target. Must be picklable (not
+        a lambda) when n_workers is not 1
+    n_iterations : int
+        Iterations per temperature
+    temperatures : array, optional
+        Ladder starting at 1. Defaults to n_temps geometric steps up to
+        max_temp
+    n_temps, max_temp : int, float
+        Size and top of the default ladder
+    proposal_std : float
+        Proposal standard deviation at T = 1, scaled by sqrt(T) up the ladder
+    initial : float or array
+        Starting value, or one per temperature
+    swap_interval : int
+        Iterations between swap sweeps
+    n_workers : int or None
+        If not 1, split the ladder over this many persistent worker
+        processes (None: one per temperature). Results are the same for
+        any n_workers
+    seed : int or None
+        Seed for the per-temperature and swap RNG streams
+
+    Returns:
+    --------
+    samples : array
+        (n_temps, n_iterations) draws; row 0 is the T = 1 chain
+    swap_rates : array
+        Swap acceptance rate for each adjacent pair of temperatures
+    acceptance_rates : array
+        Within-temperature acceptance rate per temperature
+    """
+    if temperatures is None:
+        temperatures = np.geomspace(1.0, max_temp, n_temps)
+    temperatures = np.asarray(temperatures, dtype=float)
+    n_temps = len(temperatures)
+    betas = 1 / temperatures
+    proposal_stds = proposal_std * np.sqrt(temperatures)
+
+    seeds = np.random.SeedSequence(seed).spawn(n_temps + 1)
+    rngs = [np.random.default_rng(seq) for seq in seeds[:-1]]
+    swap_rng = np.random.default_rng(seeds[-1])
+
+    x = np.broadcast_to(np.asarray(initial, dtype=float), (n_temps,)).copy()
+    log_p = log_target(x)
+    samples = np.zeros((n_temps, n_iterations))
+    n_accepted = np.zeros(n_temps)
+    swaps_proposed = np.zeros(n_temps - 1)
+    swaps_accepted = np.zeros(n_temps - 1)
+
+    n_segments = 1 if n_workers == 1 else min(n_temps, n_workers or n_temps)
+    segments = np.array_split(np.arange(n_temps), n_segments)
+    connections, workers = [], []
+    if n_workers != 1:
+        for seg in segments:
+            parent_end, child_end = Pipe()
+            worker = Process(target=tempering_worker, daemon=True,
+                             args=(child_end, log_target, betas[seg], proposal_stds[seg],
+                                   [rngs[k] for k in seg], n_iterations))
+            worker.start()
+            child_end.close()
+            connections.append(parent_end)
+            workers.append(worker)
+
+    try:
+        for round_start in range(0, n_iterations, swap_interval):
+            n_steps = min(swap_interval, n_iterations - round_start)
+            if not workers:
+                (samples[:, round_start:round_start + n_steps], x, log_p,
+                 accepted) = tempered_segment(log_target, betas, x, log_p,
+                                              proposal_stds, rngs, n_steps)
+                n_accepted += accepted
+            else:
+                for seg, connection in zip(segments, connections):
+                    connection.send((x[seg], log_p[seg], n_steps))
+                for seg, connection in zip(segments, connections):
+                    x[seg], log_p[seg] = connection.recv()
+
+            # Swap sweep over even or odd adjacent pairs
+            lower = np.arange(round_start // swap_interval % 2, n_temps - 1, 2)
+            upper = lower + 1
+            log_r = (betas[lower] - betas[upper]) * (log_p[upper] - log_p[lower])
+            swap = np.log(swap_rng.random(len(lower))) < log_r
+            lo, up = lower[swap], upper[swap]
+            x[lo], x[up] = x[up], x[lo]
+            log_p[lo], log_p[up] = log_p[up], log_p[lo]
+            swaps_proposed[lower] += 1
+            swaps_accepted[lower] += swap
+
+        for seg, connection in zip(segments, connections):
+            connection.send(None)
+            samples[seg], n_accepted[seg] = connection.recv()
+    finally:
+        for worker in workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+
+    swap_rates = swaps_accepted / np.maximum(swaps_proposed, 1)
+    return samples, swap_rates, n_accepted / n_iterations
+
+
+def finite_difference_gradient(log_target, eps=1e-5):
+    """
+    Vectorized central-difference gradient of a log density
+
+    All 2 * d perturbed copies of every state are stacked into one array,
+    so the log density is called once per gradient evaluation.
+
+    Parameters:
+    -----------
+    log_target : callable
+        Log density taking (n_points, d) arrays
+    eps : float
+        Relative step size
+
+    Returns:
+    --------
+    grad : callable
+        grad(x) for x of shape (n_points, d), returning (n_points, d)
+    """
+    def grad(x):
+        n, d = x.shape
+        h = eps * (1 + np.abs(x))
+        shifts = np.eye(d) * h[:, :, None]   # (n, d, d): row j moves coordinate j
+        points = np.concatenate([x[:, None, :] + shifts, x[:, None, :] - shifts])
+        values = log_target(points.reshape(-1, d)).reshape(2, n, d)
+        return (values[0] - values[1]) / (2 * h)
+    return grad
+
+
+def gradient_sampler_setup(log_target, grad, initial, n_chains, scalar_target=None):
+    """
+    Common state handling for mala and hmc
+
+    Returns (n_chains, d) starting states, whether the target is scalar,
+    and log density and gradient functions that work on (n_chains, d).
+    """
+    x, scalar = chain_starts(initial, n_chains, scalar_target)
+
+    def log_p(states):
+        return log_target(states[:, 0] if scalar else states)
+
+    if grad is None:
+        grad_log_p = finite_difference_gradient(log_p)
+    elif scalar:
+        def grad_log_p(states):
+            return np.reshape(grad(states[:, 0]), states.shape)
+    else:
+        grad_log_p = grad
+
+    return x, scalar, log_p, grad_log_p
+
+
+class DualAveraging:
+    """
+    Dual averaging step-size adaptation (Hoffman and Gelman, 2014)
+
+    Keeps one step size per chain and moves log(step) so that the average
+    acceptance probability approaches target_accept.
+    """
+    def __init__(self, step_size, target_accept, gamma=0.05, t0=10, kappa=0.75):
+        self.mu = np.log(10 * step_size)
+        self.target_accept = target_accept
+        self.gamma, self.t0, self.kappa = gamma, t0, kappa
+        self.h_bar = np.zeros_like(step_size)
+        self.log_step_bar = np.zeros_like(step_size)
+        self.m = 0
+
+    def update(self, accept_prob):
+        """Record one iteration and return the next step size"""
+        self.m += 1
+        weight = 1 / (self.m + self.t0)
+        self.h_bar = (1 - weight) * self.h_bar + weight * (self.target_accept - accept_prob)
+        log_step = self.mu - np.sqrt(self.m) / self.gamma * self.h_bar
+        eta = self.m**(-self.kappa)
+        self.log_step_bar = eta * log_step + (1 - eta) * self.log_step_bar
+        return np.exp(log_step)
+
+    def final_step_size(self):
+        """Averaged step size used once warm-up is over"""
+        return np.exp(self.log_step_bar)
+
+
+def mala(log_target, n_iterations, step_size=0.1, n_chains=None, initial=0.0,
+         grad=None, n_warmup=1000, target_accept=0.574, scalar_target=None):
+    """
+    Metropolis-adjusted Langevin algorithm
+
+    Proposals follow the gradient: x' = x + (eps^2 / 2) grad log pi(x) + eps z,
+    with a Metropolis-Hastings correction for the asymmetric proposal. The
+    log density and gradient at the current state are cached.
+
+    Parameters:
+    -----------
+    log_target : callable
+        Log density. Takes (n_chains, d) states, or (n_chains,) for a
+        scalar target, and returns one value per chain
+    n_iterations : int
+        Number of draws kept per chain after warm-up
+    step_size : float
+        Initial step size eps
+    n_chains : int or None
+        Number of chains advanced in lockstep (None for one chain)
+    initial : float or array
+        Starting point: scalar, (d,) or (n_chains, d), or one scalar per
+        chain as an (n_chains, 1) array (see chain_starts)
+    grad : callable, optional
+        Gradient of log_target with the same input shape. If None, a
+        vectorized finite-difference gradient is used
+    n_warmup : int
+        Iterations of dual-averaging step-size adaptation, discarded
+    target_accept : float
+        Acceptance rate aimed for during warm-up
+    scalar_target : bool or None
+        Whether log_target takes scalar states; None reads it from initial
+        as described in chain_starts
+
+    Returns:
+    --------
+    samples : array
+        Shape (n_iterations, d), or (n_chains, n_iterations, d) with several
+        chains; the d axis is dropped for a scalar target
+    acceptance_rate : float or array
+        Acceptance rate after warm-up, one per chain in multi-chain mode
+    """
+    x, scalar, log_p, grad_log_p = gradient_sampler_setup(log_target, grad, initial,
+                                                          n_chains, scalar_target)
+    n_c, d = x.shape
+    eps = np.full(n_c, float(step_size))
+    adapter = DualAveraging(eps, target_accept)
+
+    lp, g = log_p(x), grad_log_p(x)
+    samples = np.zeros((n_c, n_iterations, d))
+    n_accepted = np.zeros(n_c)
+
+    for i in range(n_warmup + n_iterations):
+        e = eps[:, None]
+        mean_forward = x + 0.5 * e**2 * g
+        x_proposed = mean_forward + e * np.random.standard_normal((n_c, d))
+        lp_proposed, g_proposed = log_p(x_proposed), grad_log_p(x_proposed)
+        mean_backward = x_proposed + 0.5 * e**2 * g_proposed
+
+        # log q(x | x') - log q(x' | x)
+        log_q_ratio = (np.sum((x_proposed - mean_forward)**2, axis=1)
+                       - np.sum((x - mean_backward)**2, axis=1)) / (2 * eps**2)
+        log_ratio = np.nan_to_num(lp_proposed - lp + log_q_ratio, nan=-np.inf)
+
+        accept = np.log(np.random.rand(n_c)) < log_ratio
+        x = np.where(accept[:, None], x_proposed, x)
+        lp = np.where(accept, lp_proposed, lp)
+        g = np.where(accept[:, None], g_proposed, g)
+
+        if i < n_warmup:
+            eps = adapter.update(np.exp(np.minimum(0, log_ratio)))
+            if i == n_warmup - 1:
+                eps = adapter.final_step_size()
+        else:
+            samples[:, i - n_warmup] = x
+            n_accepted += accept
+
+    return gradient_sampler_output(samples, n_accepted / n_iterations, scalar, n_chains)
+
+
+def hmc(log_target, n_iterations, step_size=0.1, n_chains=None, initial=0.0,
+        grad=None, n_warmup=1000, target_accept=0.65, n_leapfrog=20,
+        jitter=0.2, scalar_target=None):
+    """
+    Hamiltonian Monte Carlo with a leapfrog integrator
+
+    The leapfrog loop updates preallocated position, momentum and gradient
+    buffers in place, so each step allocates nothing beyond what the
+    gradient function itself returns.
+
+    Parameters:
+    -----------
+    log_target, n_iterations, step_size, n_chains, initial, grad, n_warmup,
+    scalar_target :
+        As in mala
+    target_accept : float
+        Acceptance rate aimed for during warm-up
+    n_leapfrog : int
+        Leapfrog steps per proposal
+    jitter : float
+        Each iteration's step size is drawn uniformly within +/- jitter of
+        the adapted one, which stops a fixed trajectory length from
+        resonating with the period of some coordinate
+
+    Returns:
+    --------
+    samples, acceptance_rate :
+        As in mala
+    """
+    x, scalar, log_p, grad_log_p = gradient_sampler_setup(log_target, grad, initial,
+                                                          n_chains, scalar_target)
+    n_c, d = x.shape
+    eps = np.full(n_c, float(step_size))
+    adapter = DualAveraging(eps, target_accept)
+
+    lp, g = log_p(x), grad_log_p(x)
+    samples = np.zeros((n_c, n_iterations, d))
+    n_accepted = np.zeros(n_c)
+
+    # Leapfrog buffers
+    q = np.empty_like(x)
+    p = np.empty_like(x)
+    g_new = np.empty_like(x)
+    scratch = np.empty_like(x)
+
+    for i in range(n_warmup + n_iterations):
+        e = (eps * np.random.uniform(1 - jitter, 1 + jitter, n_c))[:, None]
+        p0 = np.random.standard_normal((n_c, d))
+        q[...] = x
+        g_new[...] = g
+
+        # Half step for momentum, alternating full steps, final half step
+        np.multiply(g_new, 0.5 * e, out=scratch)
+        np.add(p0, scratch, out=p)
+        for step in range(n_leapfrog):
+            np.multiply(p, e, out=scratch)
+            q += scratch
+            g_new[...] = grad_log_p(q)
+            np.multiply(g_new, e if step < n_leapfrog - 1 else 0.5 * e, out=scratch)
+            p += scratch
+
+        lp_proposed = log_p(q)
+        log_ratio = (lp_proposed - 0.5 * np.sum(p**2, axis=1)) - (lp - 0.5 * np.sum(p0**2, axis=1))
+        log_ratio = np.nan_to_num(log_ratio, nan=-np.inf)
+
+        accept = np.log(np.random.rand(n_c)) < log_ratio
+        x = np.where(accept[:, None], q, x)
+        lp = np.where(accept, lp_proposed, lp)
+        g = np.where(accept[:, None], g_new, g)
+
+        if i < n_warmup:
+            eps = adapter.update(np.exp(np.minimum(0, log_ratio)))
+            if i == n_warmup - 1:
+                eps = adapter.final_step_size()
+        else:
+            samples[:, i - n_warmup] = x
+            n_accepted += accept
+
+    return gradient_sampler_output(samples, n_accepted / n_iterations, scalar, n_chains)
+
+
+def gradient_sampler_output(samples, acceptance_rate, scalar, n_chains):
+    """Shape mala and hmc output like metropolis_hastings"""
+    if scalar:
+        samples = samples[..., 0]
+    if n_chains is None:
+        return samples[0], float(acceptance_rate[0])
     return samples, acceptance_rate
 
-# Run MCMC
-n_iter = 10000
-samples, acc_rate = metropolis_hastings(target_density, n_iter)
-
-print(f"Acceptance rate: {acc_rate:.3f}")
-print(f"Sample mean: {np.mean(samples[1000:]):.3f}")  # Burn-in first 1000
-
-# Visualization
-fig, axes = plt.subplots(1, 3, figsize=(15, 4))
-
-# Trace plot
-axes[0].plot(samples[:500])
-axes[0].set_title('Trace Plot (first 500 iterations)')
-axes[0].set_xlabel('Iteration')
-
-# Histogram vs true density
-x_range = np.linspace(-5, 8, 200)
-axes[1].hist(samples[1000:], bins=50, density=True, alpha=0.5, label='MCMC samples')
-axes[1].plot(x_range, [target_density(x) for x in x_range], 'r-', linewidth=2, label='True density')
-axes[1].set_title('Samples vs Target Distribution')
-axes[1].legend()
-
-# Autocorrelation
-from pandas.plotting import autocorrelation_plot
-axes[2].acorr(samples[1000:]-np.mean(samples[1000:]), maxlags=100)
-axes[2].set_title('Autocorrelation')
-
-plt.tight_layout()
-plt.savefig('/home/titan/pdfs/notes/statisticalComputingAndReporting/groupWork/answers/16.Markov_Chain_Monte_Carlo_I/metropolis_hastings.png', dpi=150)
-print("Visualization saved")
-plt.close()
+
+if __name__ == "__main__":
+    print("=== Metropolis-Hastings MCMC ===\n")
+
+    # Run MCMC
+    n_iter = 10000
+    start = time.perf_counter()
+    samples, acc_rate = metropolis_hastings(target_density, n_iter)
+    single_time = time.perf_counter() - start
+
+    print(f"Acceptance rate: {acc_rate:.3f}")
+    print(f"Sample mean: {np.mean(samples[1000:]):.3f}")  # Burn-in first 1000
+
+    # Multi-chain mode: 32 chains from overdispersed starting points
+    n_chains = 32
+    start = time.perf_counter()
+    chains, chain_acc = metropolis_hastings(target_density, n_iter, n_chains=n_chains,
+                                            initial=np.linspace(-6, 8, n_chains))
+    multi_time = time.perf_counter() - start
+
+    print(f"\n{n_chains} chains: shape {chains.shape}, "
+          f"mean acceptance rate {np.mean(chain_acc):.3f}")
+    print(f"Pooled sample mean: {np.mean(chains[:, 1000:]):.3f}")
+    diagnostics = summarize(chains[:, 1000:])
+    print(f"ESS: {diagnostics['ess']:.0f}, split R-hat: {diagnostics['rhat']:.3f}, "
+          f"MCSE of mean: {diagnostics['mcse']:.4f}")
+    print(f"Wall time: 1 chain {single_time:.2f}s, {n_chains} chains {multi_time:.2f}s\n")
+
+    # Stream a long multi-chain run to disk: only one block is held in RAM
+    n_long = 200_000
+    path = os.path.join(tempfile.gettempdir(), 'metropolis_hastings_trace.npy')
+    sink = TraceSink(path, n_long, n_chains=8, burn_in=1000, thin=10)
+    metropolis_hastings(log_target_density, n_long, proposal_std=2.5, n_chains=8,
+                        initial=np.linspace(-6, 8, 8), log_density=True, sink=sink)
+    print(f"Streamed {sink.count} kept draws per chain to {path}")
+    print(f"Running mean {np.mean(sink.mean):.3f}, running variance "
+          f"{np.mean(sink.variance):.3f}")
+    trace = sink.close()
+    diagnostics = summarize(trace)
+    print(f"From memmap: ESS {diagnostics['ess']:.0f}, "
+          f"split R-hat {diagnostics['rhat']:.3f}\n")
+    del trace
+    os.remove(path)
+
+    # Log-density with the current state cached: one evaluation per iteration
+    counted = CountedTarget(log_target_density)
+    log_samples, log_acc = metropolis_hastings(counted, n_iter, log_density=True)
+    print(f"Log-density sampler acceptance rate: {log_acc:.3f}")
+    print(f"Target evaluations: {counted.n_evaluations} "
+          f"(recomputing the current state would need {2 * n_iter})\n")
+
+    # Adaptive proposal: tune the scale during burn-in, then freeze it
+    for start_std in [0.05, 50.0]:
+        _, fixed_acc = metropolis_hastings(log_target_density, n_iter,
+                                           proposal_std=start_std, log_density=True)
+        _, adapt_acc, adapt_scale, _ = adaptive_metropolis(
+            log_target_density, n_iter, 0.0, proposal_std=start_std)
+        print(f"proposal_std={start_std}: fixed acceptance {fixed_acc:.3f}, "
+              f"adapted acceptance {adapt_acc:.3f} (scale {adapt_scale:.2f})")
+
+    # Haario covariance adaptation on a correlated 10-dimensional normal
+    dim = 10
+    true_cov = 0.9 * np.ones((dim, dim)) + 0.1 * np.eye(dim)
+    precision = np.linalg.inv(true_cov)
+
+    def log_mvn(x):
+        return -0.5 * np.einsum('ci,ij,cj->c', x, precision, x)
+
+    mvn_samples, mvn_acc, _, learned_cov = adaptive_metropolis(
+        log_mvn, n_iter, np.zeros(dim), n_burnin=5000, n_chains=4)
+    print(f"10-d normal: acceptance rates {np.round(mvn_acc, 3)}")
+    print(f"Max error of learned covariance: {np.max(np.abs(learned_cov - true_cov)):.3f}\n")
+
+    # Parallel tempering: hot chains carry states between the two modes
+    pt_samples, swap_rates, pt_acc = parallel_tempering(log_target_density, n_iter,
+                                                        seed=2024)
+    print(f"Temperatures: {np.round(np.geomspace(1, 50, 8), 2)}")
+    print(f"Swap rates: {np.round(swap_rates, 3)}")
+    print(f"Share of T=1 draws in the left mode: {np.mean(pt_samples[0, 1000:] < 0.5):.3f} "
+          f"(plain MH: {np.mean(samples[1000:] < 0.5):.3f}, "
+          f"true: {norm.cdf(0.5, -2, 0.8) * 0.3 + norm.cdf(0.5, 3, 1.5) * 0.7:.3f})")
+    print(f"ESS at T=1: parallel tempering {summarize(pt_samples[0, 1000:])['ess']:.0f}, "
+          f"plain MH {summarize(samples[1000:])['ess']:.0f}\n")
+
+    # Gradient-based samplers on a 50-dimensional normal with unequal scales
+    dim = 50
+    sds = np.geomspace(0.5, 2, dim)
+
+    def log_gauss(x):
+        return -0.5 * np.sum((x / sds)**2, axis=-1)
+
+    def grad_gauss(x):
+        return -x / sds**2
+
+    def min_ess(draws):
+        return min(summarize(draws[..., k])['ess'] for k in range(dim))
+
+    print(f"{dim}-d normal, minimum ESS over coordinates per 1000 gradient evaluations:")
+    counted_grad = CountedTarget(grad_gauss, ndim=1)
+    mala_draws, mala_acc = mala(log_gauss, 2000, 0.1, 4, np.zeros(dim), grad=counted_grad)
+    print(f"  MALA: {1000 * min_ess(mala_draws) / counted_grad.n_evaluations:.2f} "
+          f"(acceptance {np.mean(mala_acc):.2f})")
+    counted_grad = CountedTarget(grad_gauss, ndim=1)
+    hmc_draws, hmc_acc = hmc(log_gauss, 2000, 0.1, 4, np.zeros(dim), grad=counted_grad)
+    print(f"  HMC: {1000 * min_ess(hmc_draws) / counted_grad.n_evaluations:.2f} "
+          f"(acceptance {np.mean(hmc_acc):.2f})")
+    counted_target = CountedTarget(log_gauss, ndim=1)
+    rw_draws, rw_acc, _, _ = adaptive_metropolis(counted_target, 2000, np.zeros(dim),
+                                                 n_chains=4)
+    print(f"  Random walk (per 1000 density evaluations): "
+          f"{1000 * min_ess(rw_draws) / counted_target.n_evaluations:.2f} "
+          f"(acceptance {np.mean(rw_acc):.2f})")
+
+    # Finite-difference gradient fallback on the 1-d mixture
+    fd_draws, fd_acc = hmc(log_target_density, 2000, 0.5, n_leapfrog=10)
+    print(f"HMC with finite-difference gradient on the mixture: "
+          f"acceptance {fd_acc:.2f}, mean {np.mean(fd_draws):.3f} (true 1.5)\n")
+
+    # Visualization
+    fig, axes = plt.subplots(1, 3, figsize=(15, 4))
+
+    # Trace plot
+    axes[0].plot(samples[:500])
+    axes[0].set_title('Trace Plot (first 500 iterations)')
+    axes[0].set_xlabel('Iteration')
+
+    # Histogram vs true density
+    x_range = np.linspace(-5, 8, 200)
+    axes[1].hist(samples[1000:], bins=50, density=True, alpha=0.5, label='MCMC samples')
+    axes[1].plot(x_range, [target_density(x) for x in x_range], 'r-', linewidth=2, label='True density')
+    axes[1].set_title('Samples vs Target Distribution')
+    axes[1].legend()
+
+    # Autocorrelation (FFT)
+    acf = autocorrelation(samples[1000:], max_lag=100)
+    axes[2].vlines(np.arange(len(acf)), 0, acf)
+    axes[2].axhline(0, color='black', linewidth=0.5)
+    axes[2].set_title('Autocorrelation')
+    axes[2].set_xlabel('Lag')
+
+    plt.tight_layout()
+    plt.savefig('/home/titan/pdfs/notes/statisticalComputingAndReporting/groupWork/answers/16.Markov_Chain_Monte_Carlo_I/metropolis_hastings.png', dpi=150)
+    print("Visualization saved")
+    plt.close()
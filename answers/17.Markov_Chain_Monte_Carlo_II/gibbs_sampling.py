@@ -2,44 +2,189 @@
 Gibbs Sampling
 MCMC method sampling from conditional distributions sequentially
 """
+import os
+import sys
+import tempfile
+import time
+
 import numpy as np
 import matplotlib.pyplot as plt
 
-print("=== Gibbs Sampling ===\n")
+# Trace storage lives with the chapter 16 samplers
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '16.Markov_Chain_Monte_Carlo_I'))
+from mcmc_diagnostics import effective_sample_size
+from trace_storage import TraceSink
+
+
+def gibbs_conditionals(precision, blocks=None):
+    """
+    Precompute the Gaussian full conditionals for each update block
+
+    For x ~ N(mu, Q^-1) and a block I, x_I | x_-I is normal with mean
+    mu_I - Q_II^-1 Q_I,-I (x_-I - mu_-I) and covariance Q_II^-1, so the
+    regression coefficients and noise factor are fixed for the whole run.
+
+    Parameters:
+    -----------
+    precision : array
+        (d, d) precision matrix Q
+    blocks : list of index arrays, optional
+        Coordinates updated jointly; defaults to one coordinate at a time
+
+    Returns:
+    --------
+    conditionals : list of (index, coefficients, noise_factor)
+        Conditional mean of z_I is z @ coefficients.T for centred z, and
+        eps @ noise_factor.T has covariance Q_II^-1 for standard normal eps
+    """
+    precision = np.asarray(precision, dtype=float)
+    d = precision.shape[0]
+    if blocks is None:
+        blocks = [[i] for i in range(d)]
+
+    conditionals = []
+    for block in blocks:
+        index = np.asarray(block)
+        q_block = precision[np.ix_(index, index)]
+        chol = np.linalg.cholesky(q_block)
+        coefficients = -np.linalg.solve(q_block, precision[index])
+        coefficients[:, index] = 0.0
+        # chol^-T has covariance (chol chol^T)^-1 = Q_II^-1
+        noise_factor = np.linalg.inv(chol).T
+        # Contiguous blocks index with a slice, which avoids fancy-indexing copies
+        if np.all(np.diff(index) == 1):
+            index = slice(index[0], index[-1] + 1)
+        conditionals.append((index, coefficients, noise_factor))
+    return conditionals
+
+
+def gaussian_gibbs(mean, n_iterations, cov=None, precision=None, n_chains=None,
+                   initial=None, blocks=None, block_size=250, sink=None):
+    """
+    Vectorized Gibbs sampler for a d-dimensional normal target
+
+    Conditionals come from the precision matrix once up front, standard
+    normals are drawn in blocks of iterations, and all chains are updated
+    together as an (n_chains, d) array, so the Python loop runs over
+    iterations and update blocks only.
+
+    Parameters:
+    -----------
+    mean : array
+        (d,) target mean
+    n_iterations : int
+        Number of sweeps over all update blocks
+    cov, precision : array
+        (d, d) target covariance or precision; give one of them
+    n_chains : int or None
+        Number of independent chains; None runs a single chain
+    initial : array, optional
+        Starting point, (d,) or (n_chains, d); defaults to zeros
+    blocks : list of index arrays, optional
+        Coordinates updated jointly, e.g. strongly correlated groups;
+        defaults to one coordinate at a time
+    block_size : int
+        Iterations per block of pre-drawn noise
+    sink : TraceSink, optional
+        Stream each block to disk instead of keeping all draws in memory
+
+    Returns:
+    --------
+    samples : array or np.memmap
+        (n_iterations, d), or (n_chains, n_iterations, d) when n_chains is
+        given, or the sink's stored draws
+    """
+    mean = np.asarray(mean, dtype=float)
+    d = mean.shape[0]
+    if precision is None:
+        precision = np.linalg.inv(cov)
+    conditionals = gibbs_conditionals(precision, blocks)
+
+    chains = 1 if n_chains is None else n_chains
+    z = np.zeros((chains, d))
+    if initial is not None:
+        z[:] = np.asarray(initial, dtype=float) - mean
+
+    out_shape = (chains, block_size, d)
+    samples = None if sink is not None else np.zeros((chains, n_iterations, d))
+    buffer = np.zeros(out_shape) if sink is not None else None
+
+    for block_start in range(0, n_iterations, block_size):
+        block = min(block_size, n_iterations - block_start)
+        noise = np.random.standard_normal((block, chains, d))
+        for index, _, noise_factor in conditionals:
+            noise[..., index] = noise[..., index] @ noise_factor.T
+        out = buffer[:, :block] if sink is not None else samples[:, block_start:block_start + block]
+
+        for j in range(block):
+            for index, coefficients, _ in conditionals:
+                z[:, index] = z @ coefficients.T + noise[j][:, index]
+            out[:, j] = z
+        out += mean
+
+        if sink is not None:
+            sink.append(out if n_chains is not None else out[0])
+
+    if sink is not None:
+        sink.flush()
+        return sink.draws
+    return samples if n_chains is not None else samples[0]
+
+
+if __name__ == "__main__":
+    print("=== Gibbs Sampling ===\n")
 
-# Bivariate normal with correlation
-rho = 0.8
-n_iterations = 5000
+    # Bivariate normal with correlation
+    rho = 0.8
+    n_iterations = 5000
 
-# Gibbs sampler for bivariate normal
-samples = np.zeros((n_iterations, 2))
-x, y = 0, 0  # Initial values
+    # Draws go to a memmap; plots and statistics read it lazily
+    path = os.path.join(tempfile.gettempdir(), 'gibbs_sampling_trace.npy')
+    sink = TraceSink(path, n_iterations, point_shape=(2,))
+    samples = gaussian_gibbs(np.zeros(2), n_iterations, cov=[[1, rho], [rho, 1]],
+                             sink=sink)
 
-for i in range(n_iterations):
-    # Sample x | y
-    x = np.random.normal(rho * y, np.sqrt(1 - rho**2))
-    # Sample y | x
-    y = np.random.normal(rho * x, np.sqrt(1 - rho**2))
+    print(f"Sample correlation: {np.corrcoef(samples[1000:].T)[0,1]:.3f}")
+    print(f"True correlation: {rho}")
+    print(f"Running means: {np.round(sink.mean, 3)}, "
+          f"variances: {np.round(sink.variance, 3)}\n")
 
-    samples[i] = [x, y]
+    # 200-d target made of strongly correlated pairs, 16 chains at once
+    d, pair_rho, n_chains = 200, 0.99, 16
+    cov = np.kron(np.eye(d // 2), [[1, pair_rho], [pair_rho, 1]])
+    for label, blocks in [("one coordinate at a time", None),
+                          ("blocked pairs", [[i, i + 1] for i in range(0, d, 2)])]:
+        start = time.perf_counter()
+        draws = gaussian_gibbs(np.zeros(d), 2000, cov=cov, n_chains=n_chains,
+                               initial=np.random.normal(0, 3, (n_chains, d)),
+                               blocks=blocks)
+        elapsed = time.perf_counter() - start
+        kept = draws[:, 500:]
+        cov_error = np.max(np.abs(np.cov(kept.reshape(-1, d).T) - cov))
+        print(f"d={d}, {label}: ESS of x1 {effective_sample_size(kept[:, :, 0]):.0f} "
+              f"of {kept.shape[0] * kept.shape[1]}, max covariance error {cov_error:.3f}, "
+              f"{elapsed:.2f}s")
+    print()
 
-print(f"Sample correlation: {np.corrcoef(samples[1000:].T)[0,1]:.3f}")
-print(f"True correlation: {rho}\n")
+    # Visualization
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    axes[0].plot(samples[:500, 0], samples[:500, 1], 'b-', alpha=0.3, linewidth=0.5)
+    axes[0].scatter(samples[:500, 0], samples[:500, 1], c=range(500), cmap='viridis', s=5)
+    axes[0].set_title('Gibbs Sampling Path (first 500)')
+    axes[0].set_xlabel('X')
+    axes[0].set_ylabel('Y')
 
-# Visualization
-fig, axes = plt.subplots(1, 2, figsize=(12, 5))
-axes[0].plot(samples[:500, 0], samples[:500, 1], 'b-', alpha=0.3, linewidth=0.5)
-axes[0].scatter(samples[:500, 0], samples[:500, 1], c=range(500), cmap='viridis', s=5)
-axes[0].set_title('Gibbs Sampling Path (first 500)')
-axes[0].set_xlabel('X')
-axes[0].set_ylabel('Y')
+    axes[1].scatter(samples[1000:, 0], samples[1000:, 1], alpha=0.3, s=1)
+    axes[1].set_title('Samples (after burn-in)')
+    axes[1].set_xlabel('X')
+    axes[1].set_ylabel('Y')
 
-axes[1].scatter(samples[1000:, 0], samples[1000:, 1], alpha=0.3, s=1)
-axes[1].set_title('Samples (after burn-in)')
-axes[1].set_xlabel('X')
-axes[1].set_ylabel('Y')
+    plt.tight_layout()
+    plt.savefig('/home/titan/pdfs/notes/statisticalComputingAndReporting/groupWork/answers/17.Markov_Chain_Monte_Carlo_II/gibbs_sampling.png', dpi=150)
+    print("Visualization saved")
+    plt.close()
 
-plt.tight_layout()
-plt.savefig('/home/titan/pdfs/notes/statisticalComputingAndReporting/groupWork/answers/17.Markov_Chain_Monte_Carlo_II/gibbs_sampling.png', dpi=150)
-print("Visualization saved")
-plt.close()
+    del samples
+    sink.close()
+    os.remove(path)
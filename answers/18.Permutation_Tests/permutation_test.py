@@ -2,50 +2,670 @@
 Permutation Tests
 Non-parametric hypothesis testing by shuffling labels
 """
+import os
+import sys
+from functools import lru_cache, partial
+from math import comb
+
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy import stats
+
+# Seeded sharding is shared with the bootstrap script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '12.Bootstrap'))
+from bootstrap import run_shards
+
+
+def permuted_masks(rng, rows, n_total, n1):
+    """
+    Random group-1 membership masks, one row per permutation
+
+    The n1 smallest of n_total uniforms in each row are assigned to group 1,
+    which gives a uniformly random subset using an O(n) partition per row.
+    """
+    u = rng.random((rows, n_total))
+    kth = np.partition(u, n1 - 1, axis=1)[:, n1 - 1:n1]
+    return u <= kth
+
+
+def permuted_groups(rng, combined, rows, n1):
+    """
+    Random splits of combined into (rows, n1) and (rows, n - n1) groups
+    """
+    u = rng.random((rows, len(combined)))
+    idx = np.argpartition(u, n1 - 1, axis=1)
+    return combined[idx[:, :n1]], combined[idx[:, n1:]]
+
+
+def exceedances(perm_stats, obs_stat, alternative="two-sided"):
+    """
+    Which permutation statistics are at least as extreme as the observed one
+
+    A small tolerance keeps permutations that tie with the observed value
+    from being lost to floating point rounding.
+    """
+    tol = 1e-12 * max(1.0, abs(obs_stat))
+    if alternative == "two-sided":
+        return np.abs(perm_stats) >= np.abs(obs_stat) - tol
+    if alternative == "greater":
+        return perm_stats >= obs_stat - tol
+    if alternative == "less":
+        return perm_stats <= obs_stat + tol
+    raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+
+
+def p_value_from(perm_stats, obs_stat, alternative="two-sided"):
+    """Monte Carlo p-value of an observed statistic"""
+    return np.mean(exceedances(perm_stats, obs_stat, alternative))
+
+
+@lru_cache(maxsize=32)
+def revolving_door_swaps(n, k):
+    """
+    All k-subsets of range(n) in revolving-door (Gray code) order
+
+    Uses Knuth's Algorithm R (TAOCP 7.2.1.3): consecutive subsets differ by
+    removing one element and adding one. The first subset is range(k).
+    Depends only on (n, k), so it is cached and shared by every test with
+    the same group sizes.
+
+    Returns:
+    --------
+    removed, added : int arrays of length comb(n, k) - 1
+        Element leaving and entering the subset at each step
+    """
+    c = list(range(k)) + [n]   # c[0..k-1] ascending, c[k] is a sentinel
+    removed, added = [], []
+
+    while True:
+        # R3: easy case, move the smallest element
+        if k % 2 == 1:
+            if c[0] + 1 < c[1]:
+                removed.append(c[0])
+                added.append(c[0] + 1)
+                c[0] += 1
+                continue
+            j, step = 2, "R4"
+        else:
+            if c[0] > 0:
+                removed.append(c[0])
+                added.append(c[0] - 1)
+                c[0] -= 1
+                continue
+            j, step = 2, "R5"
+
+        while j <= k:
+            if step == "R4":
+                # Try to decrease c_j
+                if c[j - 1] >= j:
+                    removed.append(c[j - 1])
+                    added.append(j - 2)
+                    c[j - 1] = c[j - 2]
+                    c[j - 2] = j - 2
+                    break
+                j += 1
+                step = "R5"
+            else:
+                # Try to increase c_j
+                if c[j - 1] + 1 < c[j]:
+                    removed.append(j - 2)
+                    added.append(c[j - 1] + 1)
+                    c[j - 2] = c[j - 1]
+                    c[j - 1] += 1
+                    break
+                j += 1
+                step = "R4"
+        else:
+            return np.array(removed, dtype=np.intp), np.array(added, dtype=np.intp)
+
+
+def exact_group_sums(combined, n1):
+    """
+    Sum of group 1 for every one of the comb(n, n1) possible assignments
+
+    Walks the revolving-door sequence, so each assignment is an O(1)
+    update of the previous sum (done as one cumulative sum).
+    """
+    removed, added = revolving_door_swaps(len(combined), n1)
+    sums = np.empty(len(removed) + 1)
+    sums[0] = combined[:n1].sum()
+    np.cumsum(combined[added] - combined[removed], out=sums[1:])
+    sums[1:] += sums[0]
+    return sums
+
+
+def permutation_chunks(group1, group2, chunk_sizes, statistic=None, rng=np.random,
+                       design="independent", strata=None):
+    """
+    Observed statistic and a generator of permutation statistics by chunk
+
+    Parameters:
+    -----------
+    group1, group2 : array
+        The two samples
+    chunk_sizes : iterable of int
+        Number of permutations in each successive chunk
+    statistic : callable, optional
+        As in permutation_test
+    rng : Generator or np.random
+        Source of random numbers
+    design : str
+        "independent" shuffles labels over the pooled sample, "paired"
+        flips the sign of each pair (swaps group1[i] and group2[i]) and
+        "stratified" shuffles labels only within strata
+    strata : array, optional
+        Stratum of each observation in np.concatenate([group1, group2]),
+        required for design="stratified"
+
+    Returns:
+    --------
+    obs_stat : float
+        Observed statistic
+    chunks : generator of arrays
+        Permutation statistics, one array per chunk size
+    """
+    group1 = np.asarray(group1, dtype=float)
+    group2 = np.asarray(group2, dtype=float)
+    combined = np.concatenate([group1, group2])
+    n1, n2 = len(group1), len(group2)
+    n_total = n1 + n2
+
+    if design == "paired":
+        if n1 != n2:
+            raise ValueError("paired design needs groups of equal length")
+        diffs = group1 - group2
+        randint = np.random.randint if rng is np.random else rng.integers
+
+        def flips(rows):
+            # One random bit per pair, drawn as packed bytes
+            packed = randint(0, 256, size=(rows, -(-n1 // 8)), dtype=np.uint8)
+            return np.unpackbits(packed, axis=1, count=n1)
+
+        if statistic is None:
+            # Mean difference with pairs flipped: (total - 2 * flipped sum) / n
+            obs_stat = diffs.mean()
+
+            def chunks():
+                for rows in chunk_sizes:
+                    flipped_sum = flips(rows).astype(float) @ diffs
+                    yield (diffs.sum() - 2 * flipped_sum) / n1
+        else:
+            obs_stat = statistic(group1[None, :], group2[None, :], axis=1)[0]
+
+            def chunks():
+                for rows in chunk_sizes:
+                    swap = flips(rows).astype(bool)
+                    yield statistic(np.where(swap, group2, group1),
+                                    np.where(swap, group1, group2), axis=1)
+
+        return obs_stat, chunks()
+
+    if design == "stratified":
+        if strata is None or len(strata) != n_total:
+            raise ValueError("stratified design needs a stratum for every observation")
+        # Sort so each stratum is a contiguous block; the integer stratum code
+        # is the offset that keeps argsort(code + uniform) inside its block
+        codes = np.unique(strata, return_inverse=True)[1]
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        combined = combined[order]
+        is_group1 = (np.arange(n_total) < n1)[order]
+
+        def masks_for(rows):
+            shuffle = np.argsort(codes + rng.random((rows, n_total)), axis=1)
+            return is_group1[shuffle]
+    elif design == "independent":
+        def masks_for(rows):
+            return permuted_masks(rng, rows, n_total, n1)
+    else:
+        raise ValueError("design must be 'independent', 'paired' or 'stratified'")
+
+    if statistic is None:
+        # mean1 - mean2 = sum1 * (1/n1 + 1/n2) - total / n2; centering on the
+        # pooled mean makes total zero, so ties with the observed statistic
+        # are not lost to cancellation when the data sit far from 0
+        scale = 1 / n1 + 1 / n2
+        centered = combined - combined.mean()
+        obs_stat = (group1 - combined.mean()).sum() * scale
+
+        def chunks():
+            for rows in chunk_sizes:
+                yield (masks_for(rows) @ centered) * scale
+    else:
+        obs_stat = statistic(group1[None, :], group2[None, :], axis=1)[0]
+
+        def chunks():
+            for rows in chunk_sizes:
+                if design == "independent":
+                    perm_g1, perm_g2 = permuted_groups(rng, combined, rows, n1)
+                else:
+                    masks = masks_for(rows)
+                    pooled = np.broadcast_to(combined, masks.shape)
+                    perm_g1 = pooled[masks].reshape(rows, n1)
+                    perm_g2 = pooled[~masks].reshape(rows, n2)
+                yield statistic(perm_g1, perm_g2, axis=1)
+
+    return obs_stat, chunks()
+
+
+def permutation_shard(group1, group2, statistic, design, strata, rows_per_chunk,
+                      n_replicates, seed_seq=None):
+    """
+    Permutation statistics for one shard, as called by run_shards
+
+    seed_seq=None draws from the global NumPy RNG, which is how the serial
+    unseeded path in permutation_test reproduces np.random.seed results.
+    """
+    rng = np.random if seed_seq is None else np.random.default_rng(seed_seq)
+    sizes = [min(rows_per_chunk, n_replicates - start)
+             for start in range(0, n_replicates, rows_per_chunk)]
+    _, chunks = permutation_chunks(group1, group2, sizes, statistic, rng,
+                                   design, strata)
+    return np.concatenate(list(chunks))
+
+
+def permutation_test(group1, group2, n_permutations=10000,
+                     alternative="two-sided", statistic=None,
+                     max_batch_bytes=2**27, seed=None, method="auto",
+                     max_enumeration=100000, design="independent", strata=None,
+                     n_workers=1, shard_size=10000):
+    """
+    Two-sample permutation test with a batched engine
+
+    Parameters:
+    -----------
+    group1, group2 : array
+        The two samples
+    n_permutations : int
+        Number of random permutations
+    alternative : str
+        "two-sided", "greater" or "less"
+    statistic : callable, optional
+        Vectorized statistic(x, y, axis) computed along axis 1 of (rows, n1)
+        and (rows, n2) arrays of permuted groups. If None, the difference in
+        means is computed for a whole chunk as one matrix-vector product of
+        the permuted label matrix with the pooled sample. Must be picklable
+        (not a lambda) when n_workers is not 1
+    max_batch_bytes : int
+        Memory budget for one chunk of permutations
+    seed : int or None
+        Seed for independent per-shard RNG streams. If None and n_workers
+        is 1, the global NumPy RNG is used
+    method : str
+        "exact" enumerates every assignment of labels, "monte_carlo" draws
+        n_permutations random ones, and "auto" is exact when there are at
+        most max_enumeration assignments. Exact mode needs the default
+        difference-in-means statistic and the independent design
+    max_enumeration : int
+        Largest number of assignments enumerated by method="auto". An
+        explicit method="exact" allows up to 100 times this and raises
+        ValueError beyond it (the enumeration is a Python loop taking about
+        0.5 s and 40 MB per million assignments)
+    design : str
+        "independent", "paired" (sign flips of matched pairs) or
+        "stratified" (labels shuffled within strata)
+    strata : array, optional
+        Stratum of each observation in np.concatenate([group1, group2]),
+        required for design="stratified"
+    n_workers : int or None
+        Number of worker processes (None uses all CPUs)
+    shard_size : int
+        Permutations per shard; together with seed it fixes the result
+
+    Returns:
+    --------
+    obs_stat : float
+        Observed statistic
+    p_value : float
+        Permutation p-value
+    perm_stats : array
+        Permutation distribution of the statistic (every assignment in
+        exact mode)
+    """
+    n1, n2 = len(group1), len(group2)
+    n_total = n1 + n2
+
+    if method == "auto":
+        exact = (statistic is None and design == "independent"
+                 and comb(n_total, n1) <= max_enumeration)
+    elif method in ("exact", "monte_carlo"):
+        exact = method == "exact"
+    else:
+        raise ValueError("method must be 'auto', 'exact' or 'monte_carlo'")
+
+    if exact:
+        if statistic is not None or design != "independent":
+            raise ValueError("exact mode supports only the difference in means "
+                             "with the independent design")
+        if comb(n_total, n1) > 100 * max_enumeration:
+            raise ValueError(f"exact mode would enumerate {comb(n_total, n1)} "
+                             f"assignments, more than 100 * max_enumeration; "
+                             f"use method='monte_carlo' or raise max_enumeration")
+        combined = np.concatenate([group1, group2]).astype(float)
+        # Centered as in permutation_chunks, so the running sums stay small
+        pooled_mean = combined.mean()
+        scale = 1 / n1 + 1 / n2
+        obs_stat = np.sum(np.asarray(group1, dtype=float) - pooled_mean) * scale
+        perm_stats = exact_group_sums(combined - pooled_mean, n1) * scale
+        return obs_stat, p_value_from(perm_stats, obs_stat, alternative), perm_stats
+
+    # One float64 uniform plus one index or mask entry per element
+    rows_per_chunk = max(1, min(n_permutations, max_batch_bytes // (16 * n_total)))
+
+    obs_stat, _ = permutation_chunks(group1, group2, [], statistic,
+                                     design=design, strata=strata)
+    shard = partial(permutation_shard, group1, group2, statistic, design, strata,
+                    rows_per_chunk)
+
+    if seed is None and n_workers == 1:
+        perm_stats = shard(n_permutations)
+    else:
+        perm_stats = run_shards(shard, n_permutations, seed, n_workers, shard_size)
+
+    return obs_stat, p_value_from(perm_stats, obs_stat, alternative), perm_stats
+
+
+def sequential_permutation_test(group1, group2, max_permutations=10000,
+                                alpha=0.05, rule="confidence", h=10,
+                                confidence=0.999, alternative="two-sided",
+                                statistic=None, first_chunk=100,
+                                max_batch_bytes=2**27, seed=None,
+                                design="independent", strata=None):
+    """
+    Permutation test that stops once the decision at alpha is settled
+
+    Permutations are drawn in chunks that start small and double in size,
+    and the stopping rule is checked after every chunk.
+
+    Parameters:
+    -----------
+    group1, group2 : array
+        The two samples
+    max_permutations : int
+        Upper limit on the number of permutations
+    alpha : float
+        Significance level the decision is made at
+    rule : str
+        "confidence" stops when a Clopper-Pearson interval for the p-value
+        (at level confidence) lies entirely above or below alpha.
+        "besag-clifford" stops after h permutations as extreme as the
+        observed statistic (Besag and Clifford, 1991), which ends clearly
+        null tests early
+    h : int
+        Exceedances needed to stop under "besag-clifford"
+    confidence : float
+        Confidence level of the interval under "confidence". It is checked
+        after every chunk, so keep it high
+    alternative, statistic, max_batch_bytes, seed, design, strata :
+        As in permutation_test
+    first_chunk : int
+        Size of the first chunk of permutations
+
+    Returns:
+    --------
+    obs_stat : float
+        Observed statistic
+    p_value : float
+        Sequential p-value estimate, (exceedances + 1) / (draws + 1) under
+        "confidence" so it is never 0
+    n_used : int
+        Number of permutations actually drawn
+    """
+    if rule not in ("confidence", "besag-clifford"):
+        raise ValueError("rule must be 'confidence' or 'besag-clifford'")
+
+    rng = np.random if seed is None else np.random.default_rng(seed)
+    n_total = len(group1) + len(group2)
+    max_chunk = max(1, max_batch_bytes // (16 * n_total))
+
+    def chunk_sizes():
+        drawn, rows = 0, first_chunk
+        while drawn < max_permutations:
+            rows = min(rows, max_chunk, max_permutations - drawn)
+            yield rows
+            drawn += rows
+            rows *= 2
+
+    obs_stat, chunks = permutation_chunks(group1, group2, chunk_sizes(),
+                                          statistic, rng, design, strata)
+    n_used, n_extreme = 0, 0
+
+    for perm_stats in chunks:
+        hits = exceedances(perm_stats, obs_stat, alternative)
+
+        if rule == "besag-clifford" and n_extreme + hits.sum() >= h:
+            # Stop exactly at the permutation giving the h-th exceedance
+            n_used += np.flatnonzero(np.cumsum(hits) == h - n_extreme)[0] + 1
+            return obs_stat, h / n_used, n_used
+
+        n_used += len(hits)
+        n_extreme += hits.sum()
+
+        if rule == "confidence":
+            tail = (1 - confidence) / 2
+            lower = stats.beta.ppf(tail, n_extreme, n_used - n_extreme + 1) \
+                if n_extreme > 0 else 0.0
+            upper = stats.beta.ppf(1 - tail, n_extreme + 1, n_used - n_extreme) \
+                if n_extreme < n_used else 1.0
+            if upper < alpha or lower > alpha:
+                return obs_stat, (n_extreme + 1) / (n_used + 1), n_used
+
+    return obs_stat, (n_extreme + 1) / (n_used + 1), n_used
+
+
+def column_statistics(sum1, sumsq1, total, total_sq, n1, n2, statistic="t"):
+    """
+    Per-column two-sample statistics from group-1 sums and pooled totals
+
+    Works on any leading shape, so the same code handles the observed
+    (m,) sums and (rows, m) sums for a chunk of permutations.
+    """
+    mean1 = sum1 / n1
+    mean2 = (total - sum1) / n2
+    if statistic == "mean_diff":
+        return mean1 - mean2
+
+    # Welch t statistic
+    var1 = (sumsq1 - n1 * mean1**2) / (n1 - 1)
+    var2 = (total_sq - sumsq1 - n2 * mean2**2) / (n2 - 1)
+    return (mean1 - mean2) / np.sqrt(var1 / n1 + var2 / n2)
+
+
+def multi_permutation_test(group1, group2, n_permutations=10000,
+                           alternative="two-sided", statistic="t",
+                           max_batch_bytes=2**27, seed=None):
+    """
+    Permutation test of m metrics that share the same two groups
+
+    Every permutation of the labels is applied to all m columns at once
+    through one matrix product per chunk, and family-wise error is
+    controlled with Westfall-Young step-down max-T adjusted p-values.
+
+    Parameters:
+    -----------
+    group1, group2 : array
+        (n1, m) and (n2, m) matrices, one column per metric
+    n_permutations : int
+        Number of random permutations
+    alternative : str
+        "two-sided", "greater" or "less"
+    statistic : str
+        "t" (Welch t, recommended for max-T since it puts metrics on a
+        common scale) or "mean_diff"
+    max_batch_bytes : int
+        Memory budget for one chunk of permutations
+    seed : int or None
+        Seed for a private Generator. If None, the global NumPy RNG is used
+
+    Returns:
+    --------
+    obs_stats : array
+        Observed statistic per column
+    p_values : array
+        Unadjusted permutation p-value per column
+    adjusted_p_values : array
+        Westfall-Young max-T adjusted p-value per column
+    """
+    if statistic not in ("t", "mean_diff"):
+        raise ValueError("statistic must be 't' or 'mean_diff'")
+    if alternative not in ("two-sided", "greater", "less"):
+        raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+
+    group1 = np.asarray(group1, dtype=float)
+    group2 = np.asarray(group2, dtype=float)
+    combined = np.vstack([group1, group2])
+    # Centering leaves both statistics unchanged and keeps sums of squares accurate
+    combined -= combined.mean(axis=0)
+    squares = combined**2
+    n1, n2 = len(group1), len(group2)
+    n_total, m = combined.shape
+
+    total = combined.sum(axis=0)
+    total_sq = squares.sum(axis=0)
+
+    def extremeness(values):
+        # Larger is more extreme for every alternative
+        if alternative == "two-sided":
+            return np.abs(values)
+        return values if alternative == "greater" else -values
+
+    obs_stats = column_statistics(combined[:n1].sum(axis=0), squares[:n1].sum(axis=0),
+                                  total, total_sq, n1, n2, statistic)
+    obs_extreme = extremeness(obs_stats)
+    tol = 1e-12 * np.maximum(1.0, np.abs(obs_extreme))
+
+    # Step-down order: most extreme observed column first
+    order = np.argsort(-obs_extreme)
+    raw_counts = np.zeros(m)
+    maxt_counts = np.zeros(m)
+
+    rng = np.random if seed is None else np.random.default_rng(seed)
+    rows_per_chunk = max(1, min(n_permutations,
+                                max_batch_bytes // (8 * (n_total + 6 * m))))
+
+    for start in range(0, n_permutations, rows_per_chunk):
+        rows = min(rows_per_chunk, n_permutations - start)
+        masks = permuted_masks(rng, rows, n_total, n1).astype(float)
+        perm_stats = column_statistics(masks @ combined, masks @ squares,
+                                       total, total_sq, n1, n2, statistic)
+        perm_extreme = extremeness(perm_stats)
+        raw_counts += np.sum(perm_extreme >= obs_extreme - tol, axis=0)
+
+        # Successive maxima over the columns not yet rejected
+        running_max = np.maximum.accumulate(perm_extreme[:, order[::-1]], axis=1)[:, ::-1]
+        maxt_counts += np.sum(running_max >= (obs_extreme - tol)[order], axis=0)
+
+    p_values = raw_counts / n_permutations
+    adjusted = np.empty(m)
+    # Enforce monotonicity down the step-down order
+    adjusted[order] = np.maximum.accumulate(maxt_counts / n_permutations)
+
+    return obs_stats, p_values, adjusted
+
+
+if __name__ == "__main__":
+    print("=== Permutation Test ===\n")
+
+    # Generate two samples
+    np.random.seed(42)
+    group1 = np.random.normal(10, 2, 30)
+    group2 = np.random.normal(11.5, 2, 30)
+
+    # Observed test statistic (difference in means)
+    obs_diff = np.mean(group1) - np.mean(group2)
+    print(f"Observed difference: {obs_diff:.4f}\n")
+
+    # Permutation test
+    n_permutations = 10000
+    obs_diff, p_value, perm_diffs = permutation_test(group1, group2,
+                                                     n_permutations)
+
+    # p-value (two-tailed)
+    print(f"Permutation p-value: {p_value:.4f}")
+
+    # One-sided test and a custom vectorized statistic
+    _, p_less, _ = permutation_test(group1, group2, n_permutations,
+                                    alternative="less")
+    print(f"One-sided p-value (mean1 < mean2): {p_less:.4f}")
+
+    def median_diff(x, y, axis=None):
+        return np.median(x, axis=axis) - np.median(y, axis=axis)
+
+    obs_med, p_med, _ = permutation_test(group1, group2, n_permutations,
+                                         statistic=median_diff)
+    print(f"Difference in medians: {obs_med:.4f}, p-value: {p_med:.4f}\n")
+
+    # Exact test for small groups: all C(16, 8) = 12870 assignments
+    small1, small2 = group1[:8], group2[:8]
+    _, p_exact, all_diffs = permutation_test(small1, small2, method="exact")
+    _, p_mc, _ = permutation_test(small1, small2, n_permutations,
+                                  method="monte_carlo")
+    print(f"Exact p-value ({len(all_diffs)} assignments): {p_exact:.4f}")
+    print(f"Monte Carlo p-value ({n_permutations} permutations): {p_mc:.4f}\n")
+
+    # Sequential early stopping
+    null_group = np.random.normal(10, 2, 30)
+    for rule in ["confidence", "besag-clifford"]:
+        for label, g1, g2 in [("clear effect", group1, group2),
+                              ("no effect", group1, null_group)]:
+            _, p_seq, n_used = sequential_permutation_test(g1, g2, n_permutations,
+                                                           rule=rule)
+            print(f"{rule:<15} {label:<13} p-value: {p_seq:.4f} "
+                  f"after {n_used} permutations")
+    print()
+
+    # Many metrics sharing the same two groups: max-T family-wise control
+    n_metrics = 500
+    metrics1 = np.random.normal(0, 1, (30, n_metrics))
+    metrics2 = np.random.normal(0, 1, (30, n_metrics))
+    metrics2[:, :10] += 1.5   # the first 10 metrics have a real effect
+    t_obs, p_raw, p_adj = multi_permutation_test(metrics1, metrics2,
+                                                 n_permutations)
+    print(f"Metrics tested: {n_metrics}")
+    print(f"Unadjusted p < 0.05: {np.sum(p_raw < 0.05)}")
+    print(f"Max-T adjusted p < 0.05: {np.sum(p_adj < 0.05)} "
+          f"(true effects found: {np.sum(p_adj[:10] < 0.05)})\n")
+
+    # Paired design: before/after measurements on the same units
+    before = np.random.normal(10, 2, 25)
+    after = before + np.random.normal(0.5, 1, 25)
+    paired_diff, p_paired, _ = permutation_test(after, before, n_permutations,
+                                                design="paired")
+    print(f"Paired mean difference: {paired_diff:.4f}, p-value: {p_paired:.4f}")
+
+    # Stratified design: groups blocked by region, shuffled within region
+    regions = np.repeat([0, 1, 2], 20)
+    region_effect = np.array([0.0, 5.0, 10.0])[regions]
+    values = region_effect + np.random.normal(0, 2, 60)
+    treated = np.tile(np.r_[np.ones(8), np.zeros(12)], 3).astype(bool)
+    values[treated] += 1.0
+    strata = np.concatenate([regions[treated], regions[~treated]])
+    strat_diff, p_strat, _ = permutation_test(values[treated], values[~treated],
+                                              n_permutations, design="stratified",
+                                              strata=strata)
+    print(f"Stratified mean difference: {strat_diff:.4f}, p-value: {p_strat:.4f}")
+
+    # Sharded across worker processes: identical for any number of workers
+    _, p_one, perms_one = permutation_test(values[treated], values[~treated],
+                                           n_permutations, design="stratified",
+                                           strata=strata, seed=2024, shard_size=2500)
+    _, p_four, perms_four = permutation_test(values[treated], values[~treated],
+                                             n_permutations, design="stratified",
+                                             strata=strata, seed=2024, shard_size=2500,
+                                             n_workers=4)
+    print(f"Parallel p-value: {p_four:.4f} "
+          f"(bit-identical to serial: {np.array_equal(perms_one, perms_four)})\n")
 
-print("=== Permutation Test ===\n")
-
-# Generate two samples
-np.random.seed(42)
-group1 = np.random.normal(10, 2, 30)
-group2 = np.random.normal(11.5, 2, 30)
-
-# Observed test statistic (difference in means)
-obs_diff = np.mean(group1) - np.mean(group2)
-print(f"Observed difference: {obs_diff:.4f}\n")
-
-# Permutation test
-n_permutations = 10000
-perm_diffs = []
-combined = np.concatenate([group1, group2])
-n1 = len(group1)
-
-for _ in range(n_permutations):
-    # Shuffle labels
-    perm_idx = np.random.permutation(len(combined))
-    perm_g1 = combined[perm_idx[:n1]]
-    perm_g2 = combined[perm_idx[n1:]]
-
-    perm_diff = np.mean(perm_g1) - np.mean(perm_g2)
-    perm_diffs.append(perm_diff)
-
-perm_diffs = np.array(perm_diffs)
-
-# Calculate p-value (two-tailed)
-p_value = np.mean(np.abs(perm_diffs) >= np.abs(obs_diff))
-print(f"Permutation p-value: {p_value:.4f}\n")
-
-# Visualization
-plt.figure(figsize=(10, 6))
-plt.hist(perm_diffs, bins=50, density=True, alpha=0.7, edgecolor='black')
-plt.axvline(obs_diff, color='r', linestyle='--', linewidth=2, label=f'Observed diff = {obs_diff:.3f}')
-plt.axvline(-obs_diff, color='r', linestyle='--', linewidth=2)
-plt.xlabel('Difference in Means')
-plt.ylabel('Density')
-plt.title(f'Permutation Distribution (p-value = {p_value:.4f})')
-plt.legend()
-plt.savefig('/home/titan/pdfs/notes/statisticalComputingAndReporting/groupWork/answers/18.Permutation_Tests/permutation_test.png', dpi=150)
-print("Visualization saved")
-plt.close()
+    # Visualization
+    plt.figure(figsize=(10, 6))
+    plt.hist(perm_diffs, bins=50, density=True, alpha=0.7, edgecolor='black')
+    plt.axvline(obs_diff, color='r', linestyle='--', linewidth=2, label=f'Observed diff = {obs_diff:.3f}')
+    plt.axvline(-obs_diff, color='r', linestyle='--', linewidth=2)
+    plt.xlabel('Difference in Means')
+    plt.ylabel('Density')
+    plt.title(f'Permutation Distribution (p-value = {p_value:.4f})')
+    plt.legend()
+    plt.savefig('/home/titan/pdfs/notes/statisticalComputingAndReporting/groupWork/answers/18.Permutation_Tests/permutation_test.png', dpi=150)
+    print("Visualization saved")
+    plt.close()